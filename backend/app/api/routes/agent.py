@@ -1,14 +1,22 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Depends
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Set, Tuple
 import logging
 
 import asyncio
+import orjson
 import uuid
-from datetime import datetime, timezone
+import time
+from collections import OrderedDict, deque
 from google.genai import types
 from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
+from google.adk.sessions import BaseSessionService, DatabaseSessionService, InMemorySessionService
+
+from app.core.config import settings
+from app.core.db import get_pg_pool
+from app.core.supabase import get_supabase
+from app.core.user_cache import get_user_context, set_user_context
 
 # import your ADK agent
 from app.services.agents.resource_finder_agent.agent import root_agent
@@ -18,12 +26,40 @@ logger = logging.getLogger(__name__)
 
 
 APP_NAME = "resource_finder_agent"
-SESSION_SERVICE = InMemorySessionService()
-RUNNER = Runner(agent=root_agent, app_name=APP_NAME, session_service=SESSION_SERVICE)
 ROOT_AGENT_NAME = getattr(root_agent, "name", "ResourceFinderPipeline")
 
-# Simple in-memory job store
-JOBS: Dict[str, Dict[str, Any]] = {}
+# In-memory job store, bounded by count (LRU) and by age once finished
+MAX_JOBS = 1024
+JOB_TTL_SECONDS = 3600
+JOB_SWEEP_INTERVAL_SECONDS = 60
+# Concurrent agent runs; extra jobs wait for a slot
+_JOB_SLOTS = asyncio.Semaphore(settings.agent_max_concurrent_runs)
+_run_stats = {"active": 0}
+# Grace period for running jobs when the app shuts down
+JOB_DRAIN_TIMEOUT_SECONDS = 30
+JOBS: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+# Only the most recent steps are kept per job; /stream consumers see every step
+MAX_JOB_STEPS = 200
+# Per-step size limits for event text and tool call payloads
+MAX_STEP_TEXT = 4000
+MAX_STEP_ARGS = 1000
+MAX_STEP_RESULT = 2000
+# Bounded per-stream buffer: the agent waits when the client falls behind
+STREAM_QUEUE_SIZE = 64
+# Stream writes carry up to STREAM_BATCH_SIZE steps that were already queued together
+STREAM_BATCH_SIZE = 8
+_STREAM_END = object()
+
+# Labels for the state codes stored in users.metadata during onboarding
+STATE_LABELS = {
+    'west_virginia': 'West Virginia',
+    'kentucky': 'Kentucky',
+    'pennsylvania': 'Pennsylvania'
+}
+
+# Progress category per ADK event class; the set of event types is small and fixed
+_CATEGORY_CACHE: Dict[type, str] = {}
 
 
 class AskBody(BaseModel):
@@ -34,26 +70,160 @@ class AskBody(BaseModel):
     career_id: Optional[str] = None
 
 
-async def _ensure_session(user_id: str, session_id: str) -> None:
+def _build_session_service() -> BaseSessionService:
+    """Use a shared database for sessions when configured, so turns can land on any worker."""
+    if settings.adk_session_db_url:
+        return DatabaseSessionService(db_url=settings.adk_session_db_url)
+    return InMemorySessionService()
+
+
+def build_runner() -> Runner:
+    """Create the process-wide ADK runner; called once from the app lifespan."""
+    return Runner(agent=root_agent, app_name=APP_NAME, session_service=_build_session_service())
+
+
+def get_runner(request: Request) -> Runner:
+    return request.app.state.runner
+
+
+def _track_task(tasks: Set[asyncio.Task], coro) -> asyncio.Task:
+    """
+    Start a background task and hold a strong reference to it until it
+    finishes; the event loop only keeps weak references to running tasks.
+    """
+    task = asyncio.create_task(coro)
+    tasks.add(task)
+
+    def _done(t: asyncio.Task) -> None:
+        tasks.discard(t)
+        if not t.cancelled() and t.exception() is not None:
+            logger.error("Agent job task crashed", exc_info=t.exception())
+
+    task.add_done_callback(_done)
+    return task
+
+
+async def drain_jobs(tasks: Set[asyncio.Task]) -> None:
+    """Give in-flight agent runs a grace period on shutdown, then cancel the rest."""
+    if not tasks:
+        return
+    logger.info("Waiting up to %ss for %s running agent jobs", JOB_DRAIN_TIMEOUT_SECONDS, len(tasks))
+    _, pending = await asyncio.wait(set(tasks), timeout=JOB_DRAIN_TIMEOUT_SECONDS)
+    for task in pending:
+        task.cancel()
+    if pending:
+        logger.warning("Cancelled %s agent jobs still running at shutdown", len(pending))
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def _ensure_session(runner: Runner, user_id: str, session_id: str) -> None:
     """
     Create the session if it doesn't exist yet.
-    If it already exists, ignore the error.
     """
+    session_service = runner.session_service
+    session = await session_service.get_session(
+        app_name=APP_NAME, user_id=user_id, session_id=session_id
+    )
+    if session is not None:
+        return
     try:
-        await SESSION_SERVICE.create_session(
+        await session_service.create_session(
             app_name=APP_NAME, user_id=user_id, session_id=session_id
         )
     except Exception:
+        # Another request or worker created it in the meantime
         pass
 
 
-def _event_to_step(event: Any, index: int) -> Dict[str, Any]:
-    """Best-effort summarization of an ADK event for clearer progress UI."""
-    class_name = event.__class__.__name__
-    timestamp = datetime.now(timezone.utc).isoformat()
+def _put_job(job_id: str, job: Dict[str, Any]) -> None:
+    """Insert a job, evicting the least recently used finished ones beyond MAX_JOBS.
+
+    Running (or still queued) jobs are never evicted, so the cap can be exceeded
+    while more than MAX_JOBS runs are in flight.
+    """
+    JOBS[job_id] = job
+    JOBS.move_to_end(job_id)
+    excess = len(JOBS) - MAX_JOBS
+    if excess <= 0:
+        return
+    evict = []
+    for old_id, old_job in JOBS.items():
+        if old_job["status"] != "running":
+            evict.append(old_id)
+            if len(evict) == excess:
+                break
+    for old_id in evict:
+        del JOBS[old_id]
+
+
+async def sweep_jobs() -> None:
+    """Periodically drop finished jobs older than JOB_TTL_SECONDS."""
+    while True:
+        await asyncio.sleep(JOB_SWEEP_INTERVAL_SECONDS)
+        cutoff = time.monotonic() - JOB_TTL_SECONDS
+        expired = [
+            job_id for job_id, job in JOBS.items()
+            if job["status"] != "running" and job.get("finished_at", cutoff) < cutoff
+        ]
+        for job_id in expired:
+            JOBS.pop(job_id, None)
+        if expired:
+            logger.debug("Swept %s finished agent jobs", len(expired))
+
+
+async def _publish(job: Dict[str, Any], step: Dict[str, Any]) -> None:
+    """Record a step and push it to the live stream consumer, if any.
+
+    Steps are published one at a time on purpose; batching happens in the stream
+    consumer. put() on a non-full queue completes without suspending, so a burst of
+    steps lands in the queue before the consumer resumes, and the consumer writes
+    them out in one frame. A time window here would delay every lone step instead.
+    """
+    job["steps"].append(step)
+    job["step_count"] += 1
+    queue = job.get("queue")
+    if queue is not None:
+        await queue.put(step)
+
+
+def _clip(value: Any, limit: int) -> str:
+    """Render a value for the progress UI, at most ``limit`` characters plus an ellipsis."""
+    if isinstance(value, str):
+        text = value
+    else:
+        # Tool args/results are mostly dicts/lists: emit JSON rather than a Python repr
+        try:
+            text = orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+        except TypeError:
+            text = str(value)
+    if len(text) <= limit:
+        return text
+    return text[:limit] + "…"
 
-    # Determine category
-    lower_name = class_name.lower()
+
+_ts_second = -1
+_ts_prefix = ""
+
+
+def _utc_now_iso() -> str:
+    """UTC timestamp formatted like datetime.isoformat(), without a datetime per call.
+
+    As with isoformat(), the fractional part is left out when microseconds are 0.
+    """
+    global _ts_second, _ts_prefix
+    second, nanos = divmod(time.time_ns(), 1_000_000_000)
+    if second != _ts_second:
+        _ts_prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(second))
+        _ts_second = second
+    micros = nanos // 1000
+    if micros:
+        return f"{_ts_prefix}.{micros:06d}+00:00"
+    return f"{_ts_prefix}+00:00"
+
+
+def _event_category(event_type: type) -> str:
+    """Classify an event type by its class name and remember the result."""
+    lower_name = event_type.__name__.lower()
     if "tool" in lower_name:
         category = "tool"
     elif "agent" in lower_name:
@@ -62,6 +232,28 @@ def _event_to_step(event: Any, index: int) -> Dict[str, Any]:
         category = "llm"
     else:
         category = "system"
+    _CATEGORY_CACHE[event_type] = category
+    return category
+
+
+def _event_has_signal(event: Any) -> bool:
+    """Cheap check for events worth showing: final response, agent/tool name or text."""
+    if getattr(event, "agent_name", None) or getattr(event, "tool_name", None):
+        return True
+    content = getattr(event, "content", None)
+    parts = getattr(content, "parts", None) if content else None
+    if parts and any(getattr(part, "text", None) for part in parts):
+        return True
+    is_final_response = getattr(event, "is_final_response", None)
+    return bool(is_final_response is not None and is_final_response())
+
+
+def _event_to_step(event: Any, index: int) -> Dict[str, Any]:
+    """Best-effort summarization of an ADK event for clearer progress UI."""
+    event_type = type(event)
+    class_name = event_type.__name__
+    timestamp = _utc_now_iso()
+    category = _CATEGORY_CACHE.get(event_type) or _event_category(event_type)
 
     step: Dict[str, Any] = {
         "index": index,
@@ -71,45 +263,55 @@ def _event_to_step(event: Any, index: int) -> Dict[str, Any]:
     }
 
     # Agent/tool names if present
-    if hasattr(event, "agent_name") and getattr(event, "agent_name"):
-        step["agent"] = getattr(event, "agent_name")
-    if hasattr(event, "tool_name") and getattr(event, "tool_name"):
-        step["tool"] = getattr(event, "tool_name")
+    agent_name = getattr(event, "agent_name", None)
+    if agent_name:
+        step["agent"] = agent_name
+    tool_name = getattr(event, "tool_name", None)
+    if tool_name:
+        step["tool"] = tool_name
 
     # Extract text parts if available
     content = getattr(event, "content", None)
     parts = getattr(content, "parts", None) if content else None
     if parts:
         texts: List[str] = []
+        size = 0
         for part in parts:
             text_value = getattr(part, "text", None)
             if text_value:
                 texts.append(text_value)
+                # Stop collecting once the joined text would be cut anyway
+                size += len(text_value) + 2
+                if size >= MAX_STEP_TEXT:
+                    break
         if texts:
-            step["text"] = " \n".join(texts)[:4000]
+            step["text"] = " \n".join(texts)[:MAX_STEP_TEXT]
 
     # Arguments/results of tool calls, kept short
-    if hasattr(event, "args") and getattr(event, "args") is not None:
+    args = getattr(event, "args", None)
+    if args is not None:
         try:
-            step["args"] = str(getattr(event, "args"))[:1000]
+            step["args"] = _clip(args, MAX_STEP_ARGS)
         except Exception:
             step["args"] = "<unserializable args>"
-    if hasattr(event, "result") and getattr(event, "result") is not None:
+    result = getattr(event, "result", None)
+    if result is not None:
         try:
-            step["result"] = str(getattr(event, "result"))[:2000]
+            step["result"] = _clip(result, MAX_STEP_RESULT)
         except Exception:
             step["result"] = "<unserializable result>"
 
     # Mark final response if applicable
-    if hasattr(event, "is_final_response") and event.is_final_response():
+    is_final_response = getattr(event, "is_final_response", None)
+    if is_final_response is not None and is_final_response():
         step["final_response"] = True
 
     # Human-readable label combining sub-agent/tool and action
     label_parts: List[str] = []
-    if step.get("agent"):
-        label_parts.append(str(step["agent"]))
-    elif step.get("tool"):
-        label_parts.append(str(step["tool"]))
+    if agent_name:
+        label_parts.append(str(agent_name))
+    elif tool_name:
+        label_parts.append(str(tool_name))
     else:
         label_parts.append(class_name)
     if step.get("final_response"):
@@ -119,174 +321,211 @@ def _event_to_step(event: Any, index: int) -> Dict[str, Any]:
     return step
 
 
-async def _run_job(job_id: str, query: str, user_id: str, session_id: str, 
-                   career_title: Optional[str] = None, career_id: Optional[str] = None) -> None:
-    try:
-        await _ensure_session(user_id, session_id)
-        
-        # Enhance query with user context if available
-        enhanced_query = query
-        if user_id and user_id != "web":
-            try:
-                from app.core.supabase import get_supabase
-                supabase = get_supabase()
-                
-                # Get user availability information
-                user_result = supabase.table('users').select('metadata').eq('id', user_id).execute()
-                user_metadata = {}
-                if user_result.data and len(user_result.data) > 0:
-                    user_metadata = user_result.data[0].get('metadata', {}) or {}
-                
-                # Get selected training programs
-                profile_result = supabase.table('user_profiles')\
-                    .select('selected_training_programs')\
-                    .eq('user_id', user_id)\
-                    .execute()
-                
-                selected_programs = []
-                if profile_result.data and len(profile_result.data) > 0:
-                    all_selected = profile_result.data[0].get('selected_training_programs', []) or []
-                    # Filter for current career if career_id provided
-                    if career_id:
-                        selected_programs = [
-                            s for s in all_selected 
-                            if s.get('career_id') == career_id
-                        ]
-                    else:
-                        selected_programs = all_selected
-                
-                # Build context string
-                context_parts = []
-                
-                # Add availability constraints
-                if user_metadata:
-                    state = user_metadata.get('state')
-                    travel_constraint = user_metadata.get('travel_constraint')
-                    scheduling = user_metadata.get('scheduling')
-                    weekly_hours = user_metadata.get('weekly_hours_constraint')
-                    
-                    # State label mapping
-                    state_labels = {
-                        'west_virginia': 'West Virginia',
-                        'kentucky': 'Kentucky',
-                        'pennsylvania': 'Pennsylvania'
-                    }
-                    
-                    if state:
-                        state_name = state_labels.get(state, state)
-                        context_parts.append(f"User location: {state_name}")
-                    if travel_constraint:
-                        context_parts.append(f"Travel constraint: {travel_constraint}")
-                    if scheduling:
-                        context_parts.append(f"Scheduling preference: {scheduling}")
-                    if weekly_hours:
-                        context_parts.append(f"Weekly hours available: {weekly_hours}")
-                
-                # Add selected training programs
-                if selected_programs and len(selected_programs) > 0:
-                    programs_info = []
-                    for sel in selected_programs:
-                        programs = sel.get('selected_programs', [])
-                        if programs:
-                            programs_info.append(f"{len(programs)} programs for {sel.get('career_title', 'career')}")
-                    if programs_info:
-                        context_parts.append(f"User selected training programs: {', '.join(programs_info)}")
-                
-                # Add career context
-                if career_title:
-                    context_parts.append(f"Target career: {career_title}")
-                
-                # Enhance query with context
-                if context_parts:
-                    context_str = "\n".join(context_parts)
-                    enhanced_query = f"{query}\n\nUser Context:\n{context_str}\n\nWhen creating the learning plan, consider the user's availability constraints and include their selected training programs in the schedule."
+async def _fetch_user_context(user_id: str) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Return (users.metadata, user_profiles.selected_training_programs) for a user."""
+    cached = get_user_context(user_id)
+    if cached is not None:
+        return cached
+    context = await _load_user_context(user_id)
+    set_user_context(user_id, context)
+    return context
+
+
+async def _load_user_context(user_id: str) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    pool = get_pg_pool()
+    if pool is not None:
+        # One non-blocking round-trip instead of two PostgREST calls
+        row = await pool.fetchrow(
+            "SELECT u.metadata, p.selected_training_programs "
+            "FROM users u LEFT JOIN user_profiles p ON p.user_id = u.id "
+            "WHERE u.id = $1",
+            uuid.UUID(user_id),
+        )
+        if row is None:
+            return {}, []
+        return row["metadata"] or {}, row["selected_training_programs"] or []
+
+    supabase = get_supabase()
+
+    # supabase-py is synchronous: run both lookups on worker threads, concurrently
+    user_result, profile_result = await asyncio.gather(
+        asyncio.to_thread(
+            lambda: supabase.table('users').select('metadata').eq('id', user_id).execute()
+        ),
+        asyncio.to_thread(
+            lambda: supabase.table('user_profiles')
+            .select('selected_training_programs')
+            .eq('user_id', user_id)
+            .execute()
+        ),
+    )
+
+    user_metadata = {}
+    if user_result.data:
+        user_metadata = user_result.data[0].get('metadata', {}) or {}
+
+    all_selected = []
+    if profile_result.data:
+        all_selected = profile_result.data[0].get('selected_training_programs', []) or []
+
+    return user_metadata, all_selected
+
+
+async def _execute_job(runner: Runner, job: Dict[str, Any], query: str, user_id: str, session_id: str,
+                       career_title: Optional[str], career_id: Optional[str]) -> None:
+    """Run one agent turn for a job, publishing progress steps and the final result."""
+    await _ensure_session(runner, user_id, session_id)
+
+    # Enhance query with user context if available
+    enhanced_query = query
+    if user_id and user_id != "web":
+        try:
+            user_metadata, all_selected = await _fetch_user_context(user_id)
+
+            selected_programs = []
+            if all_selected:
+                # Filter for current career if career_id provided
+                if career_id:
+                    selected_programs = [
+                        s for s in all_selected 
+                        if s.get('career_id') == career_id
+                    ]
+                else:
+                    selected_programs = all_selected
             
-            except Exception as e:
-                logger.warning(f"Error fetching user context for agent: {e}")
-                # Continue with original query if context fetch fails
+            programs_info = ", ".join(
+                f"{len(sel['selected_programs'])} programs for {sel.get('career_title', 'career')}"
+                for sel in selected_programs
+                if sel.get('selected_programs')
+            )
+            state = user_metadata.get('state')
+
+            # Build context string in one pass, skipping unset fields
+            context_str = "\n".join(
+                f"{label}: {value}"
+                for label, value in (
+                    ("User location", STATE_LABELS.get(state, state) if state else None),
+                    ("Travel constraint", user_metadata.get('travel_constraint')),
+                    ("Scheduling preference", user_metadata.get('scheduling')),
+                    ("Weekly hours available", user_metadata.get('weekly_hours_constraint')),
+                    ("User selected training programs", programs_info),
+                    ("Target career", career_title),
+                )
+                if value
+            )
+
+            # Enhance query with context
+            if context_str:
+                enhanced_query = f"{query}\n\nUser Context:\n{context_str}\n\nWhen creating the learning plan, consider the user's availability constraints and include their selected training programs in the schedule."
         
-        content = types.Content(role="user", parts=[types.Part(text=enhanced_query)])
+        except Exception as e:
+            logger.warning("Error fetching user context for agent: %s", e)
+            # Continue with original query if context fetch fails
+    
+    content = types.Content(role="user", parts=[types.Part(text=enhanced_query)])
+
+    events = runner.run_async(
+        user_id=user_id,
+        session_id=session_id,
+        new_message=content,
+    )
+
+    final_text: Optional[str] = None
+    step_idx = 0
+    async for event in events:
+        # Filter out trivial/noise-only events before building a step
+        if not _event_has_signal(event):
+            continue
+        step = _event_to_step(event, step_idx)
+        await _publish(job, step)
+        step_idx += 1
+
+        # Capture any final response text; mark completion after stream ends
+        if step.get("final_response"):
+            parts = getattr(getattr(event, "content", None), "parts", None) or []
+            if parts and hasattr(parts[0], "text"):
+                final_text = parts[0].text
+
+    # Mark completion (use the last final response seen)
+    if final_text is None:
+        job["status"] = "error"
+        job["error"] = "No final response from agent."
+        await _publish(job, {
+            "index": step_idx,
+            "time": _utc_now_iso(),
+            "category": "system",
+            "type": "RunError",
+            "label": f"{ROOT_AGENT_NAME}: error",
+            "error": job["error"],
+        })
+    else:
+        job["status"] = "completed"
+        job["result"] = {"answer": final_text}
+        await _publish(job, {
+            "index": step_idx,
+            "time": _utc_now_iso(),
+            "category": "agent",
+            "type": "RunCompleted",
+            "agent": ROOT_AGENT_NAME,
+            "label": f"{ROOT_AGENT_NAME}: completed",
+            "preview": (final_text or "")[:500],
+        })
 
-        events = RUNNER.run_async(
-            user_id=user_id,
-            session_id=session_id,
-            new_message=content,
-        )
 
-        final_text: Optional[str] = None
-        step_idx = 0
-        async for event in events:
-            # Build step and filter out trivial/noise-only events
-            step = _event_to_step(event, step_idx)
-            has_signal = bool(
-                step.get("final_response")
-                or step.get("agent")
-                or step.get("tool")
-                or step.get("text")
-            )
-            if has_signal:
-                JOBS[job_id]["steps"].append(step)
-                step_idx += 1
-
-            # Capture any final response text; mark completion after stream ends
-            if step.get("final_response"):
-                parts = getattr(getattr(event, "content", None), "parts", None) or []
-                if parts and hasattr(parts[0], "text"):
-                    final_text = parts[0].text
-
-        # Mark completion (use the last final response seen)
-        if final_text is None:
-            JOBS[job_id]["status"] = "error"
-            JOBS[job_id]["error"] = "No final response from agent."
-            JOBS[job_id]["steps"].append({
-                "index": step_idx,
-                "time": datetime.now(timezone.utc).isoformat(),
-                "category": "system",
-                "type": "RunError",
-                "label": f"{ROOT_AGENT_NAME}: error",
-                "error": JOBS[job_id]["error"],
-            })
-        else:
-            JOBS[job_id]["status"] = "completed"
-            JOBS[job_id]["result"] = {"answer": final_text}
-            JOBS[job_id]["steps"].append({
-                "index": step_idx,
-                "time": datetime.now(timezone.utc).isoformat(),
-                "category": "agent",
-                "type": "RunCompleted",
-                "agent": ROOT_AGENT_NAME,
-                "label": f"{ROOT_AGENT_NAME}: completed",
-                "preview": (final_text or "")[:500],
-            })
+async def _run_job(runner: Runner, job: Dict[str, Any], query: str, user_id: str, session_id: str,
+                   career_title: Optional[str] = None, career_id: Optional[str] = None) -> None:
+    try:
+        # Wait for a free slot so bursts don't oversubscribe the LLM and tools
+        async with _JOB_SLOTS:
+            _run_stats["active"] += 1
+            try:
+                await _execute_job(runner, job, query, user_id, session_id, career_title, career_id)
+            finally:
+                _run_stats["active"] -= 1
+    except asyncio.CancelledError:
+        job["status"] = "error"
+        job["error"] = "Agent run was interrupted by a server shutdown."
+        raise
     except Exception as e:
-        JOBS[job_id]["status"] = "error"
-        JOBS[job_id]["error"] = str(e)
-        JOBS[job_id]["steps"].append({
-            "index": len(JOBS[job_id]["steps"]),
-            "time": datetime.now(timezone.utc).isoformat(),
+        job["status"] = "error"
+        job["error"] = str(e)
+        await _publish(job, {
+            "index": job["step_count"],
+            "time": _utc_now_iso(),
             "category": "system",
             "type": "RunException",
             "label": f"{ROOT_AGENT_NAME}: exception",
             "error": str(e),
         })
+    finally:
+        job["finished_at"] = time.monotonic()
+        queue = job.get("queue")
+        if queue is not None:
+            await queue.put(_STREAM_END)
 
 
 @router.post("/ask")
-async def ask_agent(body: AskBody) -> Dict[str, Any]:
+async def ask_agent(
+    body: AskBody, request: Request, runner: Runner = Depends(get_runner)
+) -> Dict[str, Any]:
     """Start an agent run and return a job_id for polling progress/results."""
     job_id = uuid.uuid4().hex
-    JOBS[job_id] = {
+    job = {
         "status": "running",
-        "steps": [],
+        "steps": deque(maxlen=MAX_JOB_STEPS),
+        "step_count": 0,
+        "queue": None,
         "result": None,
         "error": None,
         "user_id": body.user_id,
         "session_id": body.session_id,
     }
+    _put_job(job_id, job)
 
-    # Fire-and-forget background task on the current loop
-    asyncio.create_task(_run_job(
-        job_id, 
+    # Background task on the current loop, drained by the app on shutdown
+    _track_task(request.app.state.tasks, _run_job(
+        runner,
+        job,
         body.query, 
         body.user_id, 
         body.session_id,
@@ -297,16 +536,78 @@ async def ask_agent(body: AskBody) -> Dict[str, Any]:
     return {"job_id": job_id, "status": "running"}
 
 
-@router.get("/status/{job_id}")
-async def get_status(job_id: str) -> Dict[str, Any]:
+@router.get("/status/{job_id}", response_class=ORJSONResponse)
+async def get_status(job_id: str) -> ORJSONResponse:
     job = JOBS.get(job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
-    # Do not return user/session metadata
-    response = {
+    JOBS.move_to_end(job_id)
+    # Do not return user/session metadata; serialize with orjson directly
+    return ORJSONResponse({
         "status": job.get("status"),
-        "steps": job.get("steps", []),
+        "steps": list(job.get("steps", ())),
         "result": job.get("result"),
         "error": job.get("error"),
+    })
+
+
+@router.get("/metrics")
+async def agent_metrics(request: Request) -> Dict[str, Any]:
+    """Job and run-slot counters for monitoring."""
+    in_flight = len(request.app.state.tasks)
+    return {
+        "jobs": len(JOBS),
+        "in_flight": in_flight,
+        "active_runs": _run_stats["active"],
+        "waiting_runs": in_flight - _run_stats["active"],
+        "max_concurrent_runs": settings.agent_max_concurrent_runs,
     }
-    return response
+
+
+@router.get("/stream/{job_id}")
+async def stream_job(job_id: str) -> StreamingResponse:
+    """Stream job steps as Server-Sent Events instead of polling /status."""
+    job = JOBS.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.get("queue") is not None:
+        raise HTTPException(status_code=409, detail="Job is already being streamed")
+
+    # Snapshot and subscribe without yielding to the loop in between, so no
+    # step can be published after the snapshot but before the queue exists.
+    backlog = list(job["steps"])
+    queue: Optional[asyncio.Queue] = None
+    if job["status"] == "running":
+        queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+        job["queue"] = queue
+
+    async def event_gen():
+        try:
+            for step in backlog:
+                yield b"data: " + orjson.dumps(step) + b"\n\n"
+            if queue is not None:
+                done = False
+                while not done:
+                    step = await queue.get()
+                    if step is _STREAM_END:
+                        break
+                    frames = [b"data: " + orjson.dumps(step) + b"\n\n"]
+                    # Coalesce a burst that is already queued into one write; never wait
+                    # for more, so a lone step (the common case) goes out immediately
+                    while len(frames) < STREAM_BATCH_SIZE and not queue.empty():
+                        step = queue.get_nowait()
+                        if step is _STREAM_END:
+                            done = True
+                            break
+                        frames.append(b"data: " + orjson.dumps(step) + b"\n\n")
+                    yield b"".join(frames)
+            final = {"status": job["status"], "result": job["result"], "error": job["error"]}
+            yield b"event: end\ndata: " + orjson.dumps(final) + b"\n\n"
+        finally:
+            if queue is not None:
+                # Detach and drain so a producer blocked on a full queue resumes
+                job["queue"] = None
+                while not queue.empty():
+                    queue.get_nowait()
+
+    return StreamingResponse(event_gen(), media_type="text/event-stream")
@@ -1,22 +1,58 @@
 from fastapi import APIRouter, HTTPException, Request, Depends
-from fastapi.responses import RedirectResponse, JSONResponse
-from pydantic import BaseModel, EmailStr
-from typing import Optional
-import httpx
+from fastapi.responses import RedirectResponse
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from pydantic import AfterValidator, BaseModel, ConfigDict
+from typing import Annotated, Optional
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
 import jwt
-from datetime import datetime, timedelta
+import asyncio
+import base64
+import binascii
+import logging
+import hashlib
+import hmac
+import orjson
+import re
+import threading
+import time
+import uuid
+from cachetools import TTLCache
+from datetime import datetime, timezone
+from urllib.parse import quote, urlencode
 from app.core.config import settings
+from app.core.db import get_pg_pool
 from app.core.supabase import get_supabase
+from app.core.user_cache import USER_PROFILE_CACHE, USER_SUMMARY_CACHE, invalidate_user
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 # Pydantic models
+# 轻量邮箱格式校验（代替 email-validator），去掉首尾空白，域名部分统一小写
+_EMAIL_RE = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+def _normalize_email(value: str) -> str:
+    value = value.strip()
+    if not _EMAIL_RE.match(value):
+        raise ValueError('value is not a valid email address')
+    local, _, domain = value.rpartition('@')
+    return f'{local}@{domain.lower()}'
+
+Email = Annotated[str, AfterValidator(_normalize_email)]
+
 class LoginRequest(BaseModel):
-    email: EmailStr
+    # 只对 email 去空白；密码原样保留，首尾空格也是密码的一部分
+    model_config = ConfigDict(extra='forbid')
+
+    email: Email
     password: str
 
 class SignupRequest(BaseModel):
-    email: EmailStr
+    # 只对 email 去空白；密码原样保留，首尾空格也是密码的一部分
+    model_config = ConfigDict(extra='forbid')
+
+    email: Email
     password: str
     name: Optional[str] = None
 
@@ -29,25 +65,166 @@ GOOGLE_AUTH_URL = "https://accounts.google.com/o/oauth2/v2/auth"
 GOOGLE_TOKEN_URL = "https://oauth2.googleapis.com/token"
 GOOGLE_USERINFO_URL = "https://www.googleapis.com/oauth2/v2/userinfo"
 
+# Google 登录 URL 的参数在运行期间不变，导入时构建一次（并正确进行 URL 编码）
+_GOOGLE_LOGIN_URL = GOOGLE_AUTH_URL + "?" + urlencode({
+    "client_id": settings.google_client_id or "",
+    "redirect_uri": settings.google_redirect_uri,
+    "response_type": "code",
+    "scope": "openid email profile",
+    "access_type": "offline",
+    "prompt": "consent"
+}, quote_via=quote)
+
+# users.onboarding_completed 列是否存在（旧库只在 metadata 中记录），启动时由 probe_user_schema 检测
+HAS_ONBOARDING_COL = True
+
+# users 表中各接口实际读取的列（避免 select('*') 拉取整行）
+USER_SUMMARY_COLUMNS = 'id,email,name,picture,onboarding_completed,metadata'
+USER_PROFILE_COLUMNS = f'{USER_SUMMARY_COLUMNS},auth_provider,created_at,updated_at'
+
+def _now_iso() -> str:
+    """当前 UTC 时间的 ISO 字符串（带时区，写入 TIMESTAMPTZ 列）；每个请求取一次，created_at/updated_at 共用"""
+    return datetime.now(timezone.utc).isoformat()
+
+def _onboarded(user: dict) -> bool:
+    """onboarding 是否完成：优先读 onboarding_completed 列，再回退到 metadata 中的标记"""
+    if user.get('onboarding_completed'):
+        return True
+    metadata = user.get('metadata')
+    return bool(isinstance(metadata, dict) and metadata.get('onboarding_completed'))
+
+def probe_user_schema() -> None:
+    """启动时检测一次 users.onboarding_completed 列，代替每次写入时的 try/except 探测"""
+    global HAS_ONBOARDING_COL, USER_SUMMARY_COLUMNS, USER_PROFILE_COLUMNS
+    try:
+        get_supabase().table('users').select('onboarding_completed').limit(1).execute()
+        return
+    except Exception as e:
+        error_str = str(e).lower()
+        if 'onboarding_completed' not in error_str and '42703' not in error_str:
+            # Unrelated failure (e.g. network): keep assuming the column exists
+            logger.warning("Could not probe users schema: %s", e)
+            return
+    HAS_ONBOARDING_COL = False
+    USER_SUMMARY_COLUMNS = 'id,email,name,picture,metadata'
+    USER_PROFILE_COLUMNS = f'{USER_SUMMARY_COLUMNS},auth_provider,created_at,updated_at'
+
+# 密码哈希（Argon2id）；哈希/校验耗时几十毫秒，调用方通过 asyncio.to_thread 放到线程池执行
+_PASSWORD_HASHER = PasswordHasher(time_cost=2, memory_cost=65536, parallelism=1)
+
+def _verify_password(password_hash: Optional[str], password: str) -> bool:
+    """校验密码；没有 password_hash 的用户（Google 登录或旧账号）无法用密码登录"""
+    if not password_hash:
+        return False
+    try:
+        return _PASSWORD_HASHER.verify(password_hash, password)
+    except (VerificationError, InvalidHashError):
+        return False
+
+# JWT 配置在导入时绑定，签发/校验时不再逐次读取 settings
+_JWT_SECRET = settings.jwt_secret_key
+_JWT_ALGORITHM = settings.jwt_algorithm
+_JWT_ALGORITHMS = [_JWT_ALGORITHM]
+_JWT_TTL_SECONDS = settings.jwt_expiration_minutes * 60
+
+# Verified JWT payloads keyed by a 16-byte digest of the token; exp is re-checked on every hit
+_JWT_CACHE = TTLCache(maxsize=10_000, ttl=min(settings.jwt_cache_ttl_seconds, _JWT_TTL_SECONDS))
+_JWT_CACHE_LOCK = threading.Lock()
+
+def _jwt_cache_key(token: str) -> bytes:
+    # Fixed-size key so the cache's memory does not grow with token length
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+# HS256 签名所需的 key 和 header 在导入时准备好
+_JWT_KEY = _JWT_SECRET.encode()
+_JWT_HEADER_B64 = base64.urlsafe_b64encode(b'{"alg":"HS256","typ":"JWT"}').rstrip(b'=')
+
+def _b64url(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b'=')
+
 def create_jwt_token(user_id: str, email: str) -> str:
     """创建 JWT token"""
+    now = int(time.time())
     payload = {
         'user_id': user_id,
         'email': email,
-        'exp': datetime.utcnow() + timedelta(minutes=settings.jwt_expiration_minutes),
-        'iat': datetime.utcnow()
+        'exp': now + _JWT_TTL_SECONDS,
+        'iat': now
     }
-    return jwt.encode(payload, settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
+    if _JWT_ALGORITHM != 'HS256':
+        return jwt.encode(payload, _JWT_SECRET, algorithm=_JWT_ALGORITHM)
+    
+    # HS256: sign directly instead of going through PyJWT's algorithm/key setup per call
+    signing_input = _JWT_HEADER_B64 + b'.' + _b64url(orjson.dumps(payload))
+    signature = hmac.new(_JWT_KEY, signing_input, hashlib.sha256).digest()
+    return (signing_input + b'.' + _b64url(signature)).decode()
 
-def verify_jwt_token(token: str) -> dict:
-    """验证 JWT token"""
+def _b64url_decode(data: bytes) -> bytes:
+    return base64.urlsafe_b64decode(data + b'=' * (-len(data) % 4))
+
+def _decode_hs256(token: str) -> dict:
+    """校验 create_jwt_token 签发的 HS256 token：直接比对 HMAC 签名并检查 exp"""
     try:
-        payload = jwt.decode(token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
-        return payload
-    except jwt.ExpiredSignatureError:
-        raise HTTPException(status_code=401, detail="Token has expired")
-    except jwt.JWTError:
+        header_b64, payload_b64, signature_b64 = token.encode().split(b'.')
+        signature = _b64url_decode(signature_b64)
+    except (ValueError, binascii.Error):
         raise HTTPException(status_code=401, detail="Invalid token")
+    
+    # We only issue one header, so anything else (e.g. alg=none) is rejected outright
+    if header_b64 != _JWT_HEADER_B64:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    expected = hmac.new(_JWT_KEY, header_b64 + b'.' + payload_b64, hashlib.sha256).digest()
+    if not hmac.compare_digest(expected, signature):
+        raise HTTPException(status_code=401, detail="Invalid token")
+    
+    try:
+        payload = orjson.loads(_b64url_decode(payload_b64))
+    except (ValueError, binascii.Error):
+        raise HTTPException(status_code=401, detail="Invalid token")
+    if not isinstance(payload, dict) or not isinstance(payload.get('exp'), (int, float)):
+        raise HTTPException(status_code=401, detail="Invalid token")
+    if payload['exp'] <= time.time():
+        raise HTTPException(status_code=401, detail="Token has expired")
+    return payload
+
+def verify_jwt_token(token: str) -> dict:
+    """验证 JWT token（已验证的 token 短时间缓存，跳过重复的签名校验）"""
+    cache_key = _jwt_cache_key(token)
+    with _JWT_CACHE_LOCK:
+        payload = _JWT_CACHE.get(cache_key)
+    if payload is not None:
+        if payload.get('exp', 0) > time.time():
+            return payload
+        with _JWT_CACHE_LOCK:
+            _JWT_CACHE.pop(cache_key, None)
+        raise HTTPException(status_code=401, detail="Token has expired")
+    
+    if _JWT_ALGORITHM == 'HS256':
+        payload = _decode_hs256(token)
+    else:
+        try:
+            payload = jwt.decode(token, _JWT_SECRET, algorithms=_JWT_ALGORITHMS)
+        except jwt.ExpiredSignatureError:
+            raise HTTPException(status_code=401, detail="Token has expired")
+        except jwt.InvalidTokenError:
+            raise HTTPException(status_code=401, detail="Invalid token")
+    
+    with _JWT_CACHE_LOCK:
+        _JWT_CACHE[cache_key] = payload
+    return payload
+
+# auto_error=False: 缺少 token 时返回我们自己的 401 "Authentication required"
+_bearer_scheme = HTTPBearer(auto_error=False)
+
+async def current_user(credentials: Optional[HTTPAuthorizationCredentials] = Depends(_bearer_scheme)) -> dict:
+    """从 Authorization: Bearer <token> 中解析并验证 JWT，返回 payload（FastAPI 在同一请求内只解析一次）"""
+    if credentials is None:
+        raise HTTPException(status_code=401, detail="Authentication required")
+    return verify_jwt_token(credentials.credentials)
+
+async def current_user_id(payload: dict = Depends(current_user)) -> str:
+    """当前用户 id（供各接口 Depends 使用）"""
+    return payload['user_id']
 
 @router.get("/google/login")
 async def google_login():
@@ -58,129 +235,82 @@ async def google_login():
             detail="Google OAuth is not configured. Please set GOOGLE_CLIENT_ID and GOOGLE_CLIENT_SECRET environment variables."
         )
     
-    params = {
-        "client_id": settings.google_client_id,
-        "redirect_uri": settings.google_redirect_uri,
-        "response_type": "code",
-        "scope": "openid email profile",
-        "access_type": "offline",
-        "prompt": "consent"
-    }
-    
-    auth_url = f"{GOOGLE_AUTH_URL}?{'&'.join([f'{k}={v}' for k, v in params.items()])}"
-    return {"url": auth_url}
+    return {"url": _GOOGLE_LOGIN_URL}
+
+# OAuth 回调出错时重定向到前端的 URL 前缀（错误信息经 quote 编码后拼接）
+_CALLBACK_ERROR_PREFIX = f"{settings.frontend_url}/auth/callback?error="
+
+def _callback_error(message: str) -> RedirectResponse:
+    return RedirectResponse(url=_CALLBACK_ERROR_PREFIX + quote(message))
 
 @router.get("/google/callback")
-async def google_callback(code: str = None, error: str = None):
+async def google_callback(request: Request, code: str = None, error: str = None):
     """处理 Google OAuth 回调"""
     if not settings.google_client_id or not settings.google_client_secret:
-        error_url = f"{settings.frontend_url}/auth/callback?error=Google OAuth is not configured"
-        return RedirectResponse(url=error_url)
+        return _callback_error("Google OAuth is not configured")
     
     if error:
-        error_url = f"{settings.frontend_url}/auth/callback?error={error}"
-        return RedirectResponse(url=error_url)
+        return _callback_error(error)
     
     if not code:
-        error_url = f"{settings.frontend_url}/auth/callback?error=No authorization code received"
-        return RedirectResponse(url=error_url)
+        return _callback_error("No authorization code received")
     
     try:
         # 交换 authorization code 获取 access token
-        async with httpx.AsyncClient() as client:
-            token_response = await client.post(
-                GOOGLE_TOKEN_URL,
-                data={
-                    "code": code,
-                    "client_id": settings.google_client_id,
-                    "client_secret": settings.google_client_secret,
-                    "redirect_uri": settings.google_redirect_uri,
-                    "grant_type": "authorization_code"
-                }
-            )
-            
-            if token_response.status_code != 200:
-                raise HTTPException(status_code=400, detail="Failed to get access token")
-            
-            token_data = token_response.json()
-            access_token = token_data.get("access_token")
-            
-            # 使用 access token 获取用户信息
-            user_response = await client.get(
-                GOOGLE_USERINFO_URL,
-                headers={"Authorization": f"Bearer {access_token}"}
-            )
-            
-            if user_response.status_code != 200:
-                raise HTTPException(status_code=400, detail="Failed to get user info")
-            
-            user_info = user_response.json()
-            
+        client = request.app.state.http
+        token_response = await client.post(
+            GOOGLE_TOKEN_URL,
+            data={
+                "code": code,
+                "client_id": settings.google_client_id,
+                "client_secret": settings.google_client_secret,
+                "redirect_uri": settings.google_redirect_uri,
+                "grant_type": "authorization_code"
+            }
+        )
+        
+        if token_response.status_code != 200:
+            return _callback_error("Failed to get access token")
+        
+        token_data = token_response.json()
+        access_token = token_data.get("access_token")
+        
+        # 使用 access token 获取用户信息
+        user_response = await client.get(
+            GOOGLE_USERINFO_URL,
+            headers={"Authorization": f"Bearer {access_token}"}
+        )
+        
+        if user_response.status_code != 200:
+            return _callback_error("Failed to get user info")
+        
+        user_info = user_response.json()
+        
         # 获取用户信息
         email = user_info.get("email")
         name = user_info.get("name")
         picture = user_info.get("picture")
         
         if not email:
-            error_url = f"{settings.frontend_url}/auth/callback?error=No email received from Google"
-            return RedirectResponse(url=error_url)
+            return _callback_error("No email received from Google")
         
-        # 在 Supabase 中查找或创建用户
+        # 在 Supabase 中创建或更新用户：users.email 唯一，一次 upsert 代替查询 + 更新/插入
+        # 新用户的 metadata / onboarding_completed / created_at 取列默认值
         supabase = get_supabase()
-        
-        # 查找现有用户
-        user_result = supabase.table('users').select('*').eq('email', email).execute()
-        
-        is_new_user = False
-        
-        if user_result.data and len(user_result.data) > 0:
-            # 用户存在，更新信息
-            user = user_result.data[0]
-            update_data = {
-                'name': name,
-                'picture': picture,
-                'auth_provider': 'google',
-                'updated_at': datetime.utcnow().isoformat()
-            }
-            supabase.table('users').update(update_data).eq('id', user['id']).execute()
-            
-            # Check if user has completed onboarding
-            # Check both column and metadata fallback
-            onboarding_completed = user.get('onboarding_completed', False)
-            if not onboarding_completed:
-                # Fallback: check metadata if column doesn't exist or is False
-                metadata = user.get('metadata', {})
-                if isinstance(metadata, dict):
-                    onboarding_completed = metadata.get('onboarding_completed', False)
-            
-            if not onboarding_completed:
-                is_new_user = True
-        else:
-            # 创建新用户
-            # Don't include onboarding_completed if column doesn't exist - use metadata instead
-            new_user = {
+        user_result = await asyncio.to_thread(
+            supabase.table('users').upsert({
                 'email': email,
                 'name': name,
                 'picture': picture,
                 'auth_provider': 'google',
-                'metadata': {'onboarding_completed': False},  # Store in metadata as fallback
-                'created_at': datetime.utcnow().isoformat(),
-                'updated_at': datetime.utcnow().isoformat()
-            }
-            # Try to insert with onboarding_completed column, fallback if it doesn't exist
-            try:
-                new_user['onboarding_completed'] = False
-                user_result = supabase.table('users').insert(new_user).execute()
-            except Exception as e:
-                # If column doesn't exist, remove it and try again
-                error_str = str(e).lower()
-                if 'onboarding_completed' in error_str or 'pgrst204' in error_str:
-                    new_user.pop('onboarding_completed', None)
-                    user_result = supabase.table('users').insert(new_user).execute()
-                else:
-                    raise
-            user = user_result.data[0]
-            is_new_user = True
+                'updated_at': _now_iso()
+            }, on_conflict='email').execute
+        )
+        user = user_result.data[0]
+        invalidate_user(user['id'])
+        
+        # New users and users who have not finished onboarding are sent to it
+        is_new_user = not _onboarded(user)
         
         # 生成 JWT token
         jwt_token = create_jwt_token(user['id'], email)
@@ -190,145 +320,158 @@ async def google_callback(code: str = None, error: str = None):
         return RedirectResponse(url=frontend_callback)
         
     except Exception as e:
-        print(f"OAuth error: {str(e)}")
-        error_url = f"{settings.frontend_url}/auth/callback?error={str(e)}"
-        return RedirectResponse(url=error_url)
+        logger.exception("OAuth error")
+        return _callback_error(str(e))
 
 @router.post("/login", response_model=TokenResponse)
 async def login(request: LoginRequest):
     """邮箱密码登录"""
-    supabase = get_supabase()
-    
+    # 查找用户（只有数据库请求会意外失败，其余错误由 FastAPI 处理）
     try:
-        # 查找用户
-        user_result = supabase.table('users').select('*').eq('email', request.email).execute()
-        
-        if not user_result.data or len(user_result.data) == 0:
-            raise HTTPException(status_code=401, detail="Invalid email or password")
-        
-        user = user_result.data[0]
-        
-        # TODO: 验证密码 (需要实现密码哈希验证)
-        # For now, we'll just check if user exists
-        
-        # Check if user has completed onboarding
-        # Check both column and metadata fallback
-        onboarding_completed = user.get('onboarding_completed', False)
-        if not onboarding_completed:
-            # Fallback: check metadata if column doesn't exist or is False
-            metadata = user.get('metadata', {})
-            if isinstance(metadata, dict):
-                onboarding_completed = metadata.get('onboarding_completed', False)
-        
-        # 生成 JWT token
-        jwt_token = create_jwt_token(user['id'], user['email'])
-        
-        return TokenResponse(
-            token=jwt_token,
-            user={
-                'id': user['id'],
-                'email': user['email'],
-                'name': user.get('name'),
-                'picture': user.get('picture'),
-                'onboarding_completed': onboarding_completed
-            }
-        )
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        print(f"Login error: {str(e)}")
+        user = await _fetch_login_user(request.email)
+    except Exception:
+        logger.exception("Login error")
         raise HTTPException(status_code=500, detail="Login failed")
+    
+    if user is None:
+        raise HTTPException(status_code=401, detail="Invalid email or password")
+    
+    # 验证密码（Argon2 校验在线程池中执行，不阻塞事件循环）
+    if not await asyncio.to_thread(_verify_password, user.get('password_hash'), request.password):
+        raise HTTPException(status_code=401, detail="Invalid email or password")
+    
+    # 生成 JWT token
+    jwt_token = create_jwt_token(user['id'], user['email'])
+    
+    return {
+        'token': jwt_token,
+        'user': {
+            'id': user['id'],
+            'email': user['email'],
+            'name': user.get('name'),
+            'picture': user.get('picture'),
+            'onboarding_completed': _onboarded(user)
+        }
+    }
 
 @router.post("/signup", response_model=TokenResponse)
 async def signup(request: SignupRequest):
     """用户注册"""
     supabase = get_supabase()
     
+    # 创建新用户
+    password_hash = await asyncio.to_thread(_PASSWORD_HASHER.hash, request.password)
+    now_iso = _now_iso()
+    # Don't include onboarding_completed if column doesn't exist - use metadata instead
+    new_user = {
+        'email': request.email,
+        'name': request.name,
+        'auth_provider': 'email',
+        'password_hash': password_hash,
+        'metadata': {'onboarding_completed': False},  # Store in metadata as fallback
+        'created_at': now_iso,
+        'updated_at': now_iso
+    }
+    if HAS_ONBOARDING_COL:
+        new_user['onboarding_completed'] = False
+    # users.email 唯一：ON CONFLICT (email) DO NOTHING，邮箱已存在时不返回任何行
     try:
-        # 检查用户是否已存在
-        existing_user = supabase.table('users').select('*').eq('email', request.email).execute()
-        
-        if existing_user.data and len(existing_user.data) > 0:
-            raise HTTPException(status_code=400, detail="Email already registered")
-        
-        # 创建新用户
-        # TODO: 实现密码哈希
-        # Don't include onboarding_completed if column doesn't exist - use metadata instead
-        new_user = {
-            'email': request.email,
-            'name': request.name,
-            'auth_provider': 'email',
-            'metadata': {'onboarding_completed': False},  # Store in metadata as fallback
-            'created_at': datetime.utcnow().isoformat(),
-            'updated_at': datetime.utcnow().isoformat()
-        }
-        # Try to insert with onboarding_completed column, fallback if it doesn't exist
-        try:
-            new_user['onboarding_completed'] = False
-            user_result = supabase.table('users').insert(new_user).execute()
-        except Exception as e:
-            # If column doesn't exist, remove it and try again
-            error_str = str(e).lower()
-            if 'onboarding_completed' in error_str or 'pgrst204' in error_str:
-                new_user.pop('onboarding_completed', None)
-                user_result = supabase.table('users').insert(new_user).execute()
-            else:
-                raise
-        user = user_result.data[0]
-        
-        # 生成 JWT token
-        jwt_token = create_jwt_token(user['id'], user['email'])
-        
-        return TokenResponse(
-            token=jwt_token,
-            user={
-                'id': user['id'],
-                'email': user['email'],
-                'name': user.get('name')
-            }
+        user_result = await asyncio.to_thread(
+            supabase.table('users').upsert(new_user, on_conflict='email', ignore_duplicates=True).execute
         )
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        print(f"Signup error: {str(e)}")
+    except Exception:
+        logger.exception("Signup error")
         raise HTTPException(status_code=500, detail="Signup failed")
-
-@router.get("/me")
-async def get_current_user(request: Request):
-    """获取当前用户信息"""
-    # 从请求头获取 token
-    auth_header = request.headers.get('Authorization')
-    if not auth_header or not auth_header.startswith('Bearer '):
-        raise HTTPException(status_code=401, detail="Authentication required")
+    if not user_result.data:
+        raise HTTPException(status_code=400, detail="Email already registered")
+    user = user_result.data[0]
     
-    token = auth_header.replace('Bearer ', '')
-    payload = verify_jwt_token(token)
+    # 生成 JWT token
+    jwt_token = create_jwt_token(user['id'], user['email'])
     
-    supabase = get_supabase()
-    user_result = supabase.table('users').select('*').eq('id', payload['user_id']).execute()
+    return {
+        'token': jwt_token,
+        'user': {
+            'id': user['id'],
+            'email': user['email'],
+            'name': user.get('name')
+        }
+    }
+
+def _pg_user(row) -> Optional[dict]:
+    """asyncpg 行转成与 PostgREST 一致的 dict（UUID 转为字符串）"""
+    if row is None:
+        return None
+    user = dict(row)
+    user['id'] = str(user['id'])
+    return user
+
+async def _fetch_user_summary(user_id: str) -> Optional[dict]:
+    """按 id 读取用户摘要列；配置了 asyncpg 连接池时直连 Postgres，否则走 Supabase REST"""
+    pool = get_pg_pool()
+    if pool is not None:
+        return _pg_user(await pool.fetchrow(
+            f"SELECT {USER_SUMMARY_COLUMNS} FROM users WHERE id = $1", uuid.UUID(user_id)
+        ))
     
-    if not user_result.data or len(user_result.data) == 0:
-        raise HTTPException(status_code=404, detail="User not found")
+    supabase = get_supabase()
+    user_result = await asyncio.to_thread(supabase.table('users').select(USER_SUMMARY_COLUMNS).eq('id', user_id).execute)
+    if not user_result.data:
+        return None
+    return user_result.data[0]
+
+async def _fetch_login_user(email: str) -> Optional[dict]:
+    """按 email 读取登录所需的列（含 password_hash）；有 asyncpg 连接池时直连 Postgres"""
+    pool = get_pg_pool()
+    if pool is not None:
+        return _pg_user(await pool.fetchrow(
+            f"SELECT {USER_SUMMARY_COLUMNS},password_hash FROM users WHERE email = $1", email
+        ))
     
-    user = user_result.data[0]
+    supabase = get_supabase()
+    user_result = await asyncio.to_thread(
+        supabase.table('users').select(f'{USER_SUMMARY_COLUMNS},password_hash').eq('email', email).execute
+    )
+    return user_result.data[0] if user_result.data else None
+
+async def _fetch_user_with_profile(user_id: str) -> Optional[dict]:
+    """读取用户档案列及其 user_profiles 行（放在 'user_profiles' 键下）；有 asyncpg 连接池时一条 JOIN 完成"""
+    pool = get_pg_pool()
+    if pool is not None:
+        columns = ','.join(f'u.{c}' for c in USER_PROFILE_COLUMNS.split(','))
+        return _pg_user(await pool.fetchrow(
+            f"SELECT {columns}, "
+            "CASE WHEN p.user_id IS NULL THEN NULL ELSE to_jsonb(p) END AS user_profiles "
+            "FROM users u LEFT JOIN user_profiles p ON p.user_id = u.id WHERE u.id = $1",
+            uuid.UUID(user_id)
+        ))
     
-    # Check if user has completed onboarding
-    # Check both column and metadata fallback
-    onboarding_completed = user.get('onboarding_completed', False)
-    if not onboarding_completed:
-        # Fallback: check metadata if column doesn't exist or is False
-        metadata = user.get('metadata', {})
-        if isinstance(metadata, dict):
-            onboarding_completed = metadata.get('onboarding_completed', False)
+    # 通过外键嵌入 user_profiles（一次请求）
+    supabase = get_supabase()
+    user_result = await asyncio.to_thread(
+        supabase.table('users')
+        .select(f'{USER_PROFILE_COLUMNS},user_profiles(*)')
+        .eq('id', user_id)
+        .execute
+    )
+    return user_result.data[0] if user_result.data else None
+
+@router.get("/me")
+async def get_current_user(user_id: str = Depends(current_user_id)):
+    """获取当前用户信息"""
+    user = USER_SUMMARY_CACHE.get(user_id)
+    if user is None:
+        user = await _fetch_user_summary(user_id)
+        if user is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        USER_SUMMARY_CACHE[user_id] = user
     
     return {
         'id': user['id'],
         'email': user['email'],
         'name': user.get('name'),
         'picture': user.get('picture'),
-        'onboarding_completed': onboarding_completed
+        'onboarding_completed': _onboarded(user)
     }
 
 @router.post("/logout")
@@ -337,154 +480,102 @@ async def logout():
     return {"message": "Logged out successfully"}
 
 @router.get("/user/profile")
-async def get_user_profile(request: Request):
+async def get_user_profile(user_id: str = Depends(current_user_id)):
     """获取完整用户档案（用户信息 + profile + metadata）"""
-    # 从请求头获取 token
-    auth_header = request.headers.get('Authorization')
-    if not auth_header or not auth_header.startswith('Bearer '):
-        raise HTTPException(status_code=401, detail="Authentication required")
-    
-    token = auth_header.replace('Bearer ', '')
-    payload = verify_jwt_token(token)
-    user_id = payload['user_id']
-    
-    supabase = get_supabase()
+    cached = USER_PROFILE_CACHE.get(user_id)
+    if cached is not None:
+        return cached
     
     try:
-        # 获取用户基本信息
-        user_result = supabase.table('users').select('*').eq('id', user_id).execute()
-        
-        if not user_result.data or len(user_result.data) == 0:
+        # 获取用户基本信息和 user_profiles（一次查询）
+        user = await _fetch_user_with_profile(user_id)
+        if user is None:
             raise HTTPException(status_code=404, detail="User not found")
         
-        user = user_result.data[0]
-        
-        # 获取 user_profiles 数据
-        profile_result = supabase.table('user_profiles').select('*').eq('user_id', user_id).execute()
-        profile_data = profile_result.data[0] if profile_result.data and len(profile_result.data) > 0 else None
+        # user_profiles.user_id 是主键，PostgREST 返回单个对象；旧版本返回列表
+        profile_data = user.get('user_profiles')
+        if isinstance(profile_data, list):
+            profile_data = profile_data[0] if profile_data else None
         
         # 获取 metadata
         metadata = user.get('metadata', {})
         if not isinstance(metadata, dict):
             metadata = {}
         
-        # Check onboarding status
-        onboarding_completed = user.get('onboarding_completed', False)
-        if not onboarding_completed:
-            onboarding_completed = metadata.get('onboarding_completed', False)
-        
         # 组合返回数据
-        return {
+        payload = {
             'user': {
                 'id': user['id'],
                 'email': user['email'],
                 'name': user.get('name'),
                 'picture': user.get('picture'),
                 'auth_provider': user.get('auth_provider', 'email'),
-                'onboarding_completed': onboarding_completed,
+                'onboarding_completed': _onboarded(user),
                 'created_at': user.get('created_at'),
                 'updated_at': user.get('updated_at')
             },
             'profile': profile_data,
             'metadata': metadata
         }
+        USER_PROFILE_CACHE[user_id] = payload
+        return payload
         
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error fetching user profile: {str(e)}")
+        logger.exception("Error fetching user profile")
         raise HTTPException(status_code=500, detail=f"Failed to fetch user profile: {str(e)}")
 
+# PUT /user/profile 可以更新的字段
+# 用户字段
+_USER_FIELDS = frozenset({'name', 'picture'})
+# profile 字段 (only basic fields that exist in all schemas)
+# Note: skills, tools, certifications are handled by the assessment flow
+# and stored in JSONB columns which may not exist in all database versions
+_PROFILE_FIELDS = frozenset({
+    'career_goals', 'work_experience',
+    # Mining-specific fields
+    'previous_job_title', 'mining_role', 'mining_type', 'years_mining_experience'
+})
+# metadata 字段（onboarding 相关）
+_METADATA_FIELDS = frozenset({
+    'state', 'travel_constraint', 'budget_constraint',
+    'scheduling', 'weekly_hours_constraint', 'transition_goal',
+    'transition_goal_text', 'target_sector', 'age', 'veteran_status'
+})
+
 @router.put("/user/profile")
-async def update_user_profile(profile_update: dict, request: Request):
+async def update_user_profile(profile_update: dict, user_id: str = Depends(current_user_id)):
     """更新用户档案信息"""
-    # 从请求头获取 token
-    auth_header = request.headers.get('Authorization')
-    if not auth_header or not auth_header.startswith('Bearer '):
-        raise HTTPException(status_code=401, detail="Authentication required")
-    
-    token = auth_header.replace('Bearer ', '')
-    payload = verify_jwt_token(token)
-    user_id = payload['user_id']
-    
     supabase = get_supabase()
     
     try:
-        # 准备更新的数据
-        user_updates = {}
-        profile_updates = {}
-        metadata_updates = {}
-        
-        # 可以更新的用户字段
-        if 'name' in profile_update:
-            user_updates['name'] = profile_update['name']
-        if 'picture' in profile_update:
-            user_updates['picture'] = profile_update['picture']
-        
-        # 可以更新的 profile 字段 (only basic fields that exist in all schemas)
-        if 'career_goals' in profile_update:
-            profile_updates['career_goals'] = profile_update['career_goals']
-        if 'work_experience' in profile_update:
-            profile_updates['work_experience'] = profile_update['work_experience']
-        # Mining-specific fields
-        if 'previous_job_title' in profile_update:
-            profile_updates['previous_job_title'] = profile_update['previous_job_title']
-        if 'mining_role' in profile_update:
-            profile_updates['mining_role'] = profile_update['mining_role']
-        if 'mining_type' in profile_update:
-            profile_updates['mining_type'] = profile_update['mining_type']
-        if 'years_mining_experience' in profile_update:
-            profile_updates['years_mining_experience'] = profile_update['years_mining_experience']
-        # Note: skills, tools, certifications are handled by the assessment flow
-        # and stored in JSONB columns which may not exist in all database versions
-        
-        # 可以更新的 metadata 字段（onboarding 相关）
-        metadata_fields = [
-            'state', 'travel_constraint', 'budget_constraint',
-            'scheduling', 'weekly_hours_constraint', 'transition_goal',
-            'transition_goal_text', 'target_sector', 'age', 'veteran_status'
-        ]
-        
-        for field in metadata_fields:
-            if field in profile_update:
-                metadata_updates[field] = profile_update[field]
-        
-        # 更新 users 表
-        if user_updates:
-            user_updates['updated_at'] = datetime.utcnow().isoformat()
-            supabase.table('users').update(user_updates).eq('id', user_id).execute()
+        # 按白名单挑选可更新的字段
+        fields = profile_update.keys()
+        user_updates = {k: profile_update[k] for k in _USER_FIELDS & fields}
+        profile_updates = {k: profile_update[k] for k in _PROFILE_FIELDS & fields}
+        metadata_updates = {k: profile_update[k] for k in _METADATA_FIELDS & fields}
+        
+        # 一次 RPC 原子地更新 users、user_profiles（upsert）和 metadata（jsonb 合并）
+        if user_updates or profile_updates or metadata_updates:
+            try:
+                await asyncio.to_thread(supabase.rpc('update_user_profile_bundle', {
+                    'uid': user_id,
+                    'user_patch': user_updates,
+                    'profile_patch': profile_updates,
+                    'metadata_patch': metadata_updates
+                }).execute)
+            except Exception as e:
+                # database_setup_functions.sql not applied yet: fall back to per-table writes
+                error_str = str(e).lower()
+                if 'update_user_profile_bundle' in error_str or 'pgrst202' in error_str:
+                    await asyncio.to_thread(
+                        _update_user_profile_legacy, supabase, user_id, dict(user_updates), dict(profile_updates), metadata_updates
+                    )
+                else:
+                    raise
         
-        # 更新 user_profiles 表
-        if profile_updates:
-            profile_updates['updated_at'] = datetime.utcnow().isoformat()
-            # 检查 profile 是否存在
-            existing_profile = supabase.table('user_profiles').select('*').eq('user_id', user_id).execute()
-            if existing_profile.data and len(existing_profile.data) > 0:
-                supabase.table('user_profiles').update(profile_updates).eq('user_id', user_id).execute()
-            else:
-                # 如果不存在，创建新的 profile
-                profile_updates['user_id'] = user_id
-                profile_updates['created_at'] = datetime.utcnow().isoformat()
-                supabase.table('user_profiles').insert(profile_updates).execute()
-        
-        # 更新 metadata
-        if metadata_updates:
-            # 获取现有 metadata
-            user_result = supabase.table('users').select('metadata').eq('id', user_id).execute()
-            existing_metadata = {}
-            if user_result.data and len(user_result.data) > 0:
-                existing_metadata = user_result.data[0].get('metadata', {})
-                if not isinstance(existing_metadata, dict):
-                    existing_metadata = {}
-            
-            # 合并 metadata
-            updated_metadata = {**existing_metadata, **metadata_updates}
-            
-            # 更新 users 表
-            supabase.table('users').update({
-                'metadata': updated_metadata,
-                'updated_at': datetime.utcnow().isoformat()
-            }).eq('id', user_id).execute()
+        invalidate_user(user_id)
         
         return {
             "message": "Profile updated successfully",
@@ -498,51 +589,38 @@ async def update_user_profile(profile_update: dict, request: Request):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error updating user profile: {str(e)}")
+        logger.exception("Error updating user profile")
         raise HTTPException(status_code=500, detail=f"Failed to update user profile: {str(e)}")
 
+# onboarding 中 transitionGoal 选项对应的可读文本
+_TRANSITION_GOAL_TEXT = {
+    'quick': 'Get back to work quickly (6 months)',
+    'earnings': 'Higher long-term earnings',
+    'stable': 'Career change to a stable industry'
+}
+
 @router.post("/user/profile")
-async def save_user_profile(profile_data: dict, request: Request):
+async def save_user_profile(profile_data: dict, user_id: str = Depends(current_user_id)):
     """保存用户 onboarding 数据（Logistical Constraints + Motivation & Context）"""
-    # 从请求头获取 token
-    auth_header = request.headers.get('Authorization')
-    if not auth_header or not auth_header.startswith('Bearer '):
-        raise HTTPException(status_code=401, detail="Authentication required")
-    
-    token = auth_header.replace('Bearer ', '')
-    
-    # 验证 token
-    payload = verify_jwt_token(token)
-    user_id = payload['user_id']
-    
     supabase = get_supabase()
     
     try:
-        # 检查是否已有 profile
-        existing_profile = supabase.table('user_profiles').select('*').eq('user_id', user_id).execute()
+        now_iso = _now_iso()
         
         # Map transition goal to a readable format
-        transition_goal_map = {
-            'quick': 'Get back to work quickly (6 months)',
-            'earnings': 'Higher long-term earnings',
-            'stable': 'Career change to a stable industry'
-        }
         transition_goal = profile_data.get('transitionGoal', '')
-        career_goals_text = transition_goal_map.get(transition_goal, transition_goal)
+        career_goals_text = _TRANSITION_GOAL_TEXT.get(transition_goal, transition_goal)
         
         # Build profile payload with onboarding data
-        # Only include career_goals and work_experience (basic fields that should exist)
+        # Only include career_goals (basic field that should exist); work_experience and
+        # created_at keep their existing values, or the column defaults for a new profile
         # Skills, tools, certifications will be added by the assessment flow
         profile_payload = {
             'user_id': user_id,
             'career_goals': career_goals_text,  # Store transition goal
-            'updated_at': datetime.utcnow().isoformat()
+            'updated_at': now_iso
         }
         
-        # Only set work_experience if profile doesn't exist yet
-        if not existing_profile.data or len(existing_profile.data) == 0:
-            profile_payload['work_experience'] = ''
-        
         # Store all onboarding data in users.metadata
         metadata = {
             # Screen 1: Logistical Constraints
@@ -560,62 +638,19 @@ async def save_user_profile(profile_data: dict, request: Request):
             'veteran_status': profile_data.get('veteranStatus'),  # Optional
             
             # Timestamps
-            'onboarding_completed_at': datetime.utcnow().isoformat()
+            'onboarding_completed_at': now_iso
         }
         
-        # Update or create user_profiles - try to save, but don't fail if table has schema issues
-        profile_result = None
-        profile_saved = False
-        try:
-            if existing_profile.data and len(existing_profile.data) > 0:
-                # Update existing profile - update career_goals and preserve existing data
-                profile_result = supabase.table('user_profiles').update(profile_payload).eq('user_id', user_id).execute()
-                profile_saved = profile_result.data is not None
-            else:
-                # Create new profile
-                profile_payload['created_at'] = datetime.utcnow().isoformat()
-                profile_result = supabase.table('user_profiles').insert(profile_payload).execute()
-                profile_saved = profile_result.data is not None
-        except Exception as profile_error:
-            # Log error but continue - onboarding data will still be saved in metadata
-            print(f"Warning: Could not save to user_profiles table: {str(profile_error)}")
-            # Don't raise - we'll store everything in metadata instead
-            profile_saved = False
-        
         # Store onboarding completion status in metadata (always works)
         metadata['onboarding_completed'] = True
         
-        # If user already has metadata, merge it (preserve existing data)
-        existing_user = supabase.table('users').select('metadata').eq('id', user_id).execute()
-        if existing_user.data and len(existing_user.data) > 0:
-            existing_metadata = existing_user.data[0].get('metadata', {})
-            if isinstance(existing_metadata, dict):
-                # Merge with existing metadata (new onboarding data takes precedence)
-                metadata = {**existing_metadata, **metadata}
-        
-        # Save metadata to user table
-        user_update = {
-            'metadata': metadata,
-            'updated_at': datetime.utcnow().isoformat()
-        }
+        # user_profiles 写入与 users.metadata 合并互不依赖，并行执行
+        (profile_result, profile_saved), _ = await asyncio.gather(
+            _save_onboarding_profile(supabase, profile_payload),
+            _finalize_onboarding(supabase, user_id, metadata),
+        )
         
-        # Try to update onboarding_completed columns if they exist
-        # If they don't exist, the status is still saved in metadata
-        try:
-            supabase.table('users').update({
-                **user_update,
-                'onboarding_completed': True,
-                'onboarding_completed_at': datetime.utcnow().isoformat()
-            }).eq('id', user_id).execute()
-        except Exception as e:
-            # If onboarding_completed column doesn't exist, update without it
-            # The status is already stored in metadata above
-            error_str = str(e).lower()
-            if 'onboarding_completed' in error_str or 'pgrst204' in error_str or 'schema cache' in error_str:
-                # Fallback: just update metadata (columns will need to be added via migration)
-                supabase.table('users').update(user_update).eq('id', user_id).execute()
-            else:
-                raise
+        invalidate_user(user_id)
         
         return {
             "message": "Onboarding completed successfully",
@@ -626,6 +661,93 @@ async def save_user_profile(profile_data: dict, request: Request):
         }
         
     except Exception as e:
-        print(f"Error saving profile: {str(e)}")
+        logger.exception("Error saving profile")
         raise HTTPException(status_code=500, detail=f"Failed to save profile: {str(e)}")
 
+async def _save_onboarding_profile(supabase, profile_payload: dict):
+    """Update or create user_profiles - try to save, but don't fail if table has schema issues"""
+    try:
+        # user_id 是主键：一次 upsert 代替“查询是否存在 + 更新/插入”，冲突时只更新 payload 中的列
+        profile_result = await asyncio.to_thread(
+            supabase.table('user_profiles').upsert(profile_payload, on_conflict='user_id').execute
+        )
+        return profile_result, profile_result.data is not None
+    except Exception as profile_error:
+        # Log error but continue - onboarding data will still be saved in metadata
+        logger.warning("Could not save to user_profiles table: %s", profile_error)
+        # Don't raise - we'll store everything in metadata instead
+        return None, False
+
+async def _finalize_onboarding(supabase, user_id: str, metadata: dict) -> None:
+    """Merge metadata and set the onboarding columns in one atomic UPDATE"""
+    # finalize_onboarding needs the onboarding columns; without them only metadata is merged
+    rpc_name = 'finalize_onboarding' if HAS_ONBOARDING_COL else 'merge_user_metadata'
+    try:
+        await asyncio.to_thread(supabase.rpc(rpc_name, {'uid': user_id, 'patch': metadata}).execute)
+    except Exception as e:
+        # database_setup_functions.sql not applied yet: fall back to read-merge-write
+        error_str = str(e).lower()
+        if rpc_name in error_str or 'pgrst202' in error_str:
+            await asyncio.to_thread(_finalize_onboarding_legacy, supabase, user_id, metadata)
+        else:
+            raise
+
+def _finalize_onboarding_legacy(supabase, user_id: str, metadata: dict) -> None:
+    """finalize_onboarding 函数不存在时的旧流程：读取并合并 metadata 后更新"""
+    now_iso = _now_iso()
+    # If user already has metadata, merge it (preserve existing data)
+    existing_user = supabase.table('users').select('metadata').eq('id', user_id).execute()
+    if existing_user.data:
+        existing_metadata = existing_user.data[0].get('metadata', {})
+        if isinstance(existing_metadata, dict):
+            # Merge with existing metadata (new onboarding data takes precedence)
+            metadata = {**existing_metadata, **metadata}
+    
+    # Save metadata to user table
+    user_update = {
+        'metadata': metadata,
+        'updated_at': now_iso
+    }
+    
+    # Update onboarding_completed columns if they exist
+    # If they don't exist, the status is still saved in metadata
+    if HAS_ONBOARDING_COL:
+        user_update['onboarding_completed'] = True
+        user_update['onboarding_completed_at'] = now_iso
+    supabase.table('users').update(user_update).eq('id', user_id).execute()
+
+def _update_user_profile_legacy(supabase, user_id: str, user_updates: dict,
+                                profile_updates: dict, metadata_updates: dict) -> None:
+    """update_user_profile_bundle 函数不存在时的旧流程：逐表更新"""
+    now_iso = _now_iso()
+    
+    # 更新 users 表
+    if user_updates:
+        user_updates['updated_at'] = now_iso
+        supabase.table('users').update(user_updates).eq('id', user_id).execute()
+    
+    # 更新 user_profiles 表
+    if profile_updates:
+        profile_updates['updated_at'] = now_iso
+        # 不存在时创建新的 profile（created_at 取列默认值）
+        profile_updates['user_id'] = user_id
+        supabase.table('user_profiles').upsert(profile_updates, on_conflict='user_id').execute()
+    
+    # 更新 metadata
+    if metadata_updates:
+        # 获取现有 metadata
+        user_result = supabase.table('users').select('metadata').eq('id', user_id).execute()
+        existing_metadata = {}
+        if user_result.data:
+            existing_metadata = user_result.data[0].get('metadata', {})
+            if not isinstance(existing_metadata, dict):
+                existing_metadata = {}
+        
+        # 合并 metadata
+        updated_metadata = {**existing_metadata, **metadata_updates}
+        
+        # 更新 users 表
+        supabase.table('users').update({
+            'metadata': updated_metadata,
+            'updated_at': now_iso
+        }).eq('id', user_id).execute()
@@ -1,18 +1,27 @@
 """
 API Routes for Career Matching (Coal Miner Focused)
 """
+import asyncio
 import logging
-from fastapi import APIRouter, HTTPException, Request
+import time
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime
 from app.core.supabase import get_supabase
-from app.services.mining_skill_mapper import map_mining_skills_to_career
+from app.core.user_cache import invalidate_user
+from app.api.routes.auth import current_user_id
+from app.services.mining_skill_mapper import map_mining_skills_to_careers
 from app.services.external_apis import careeronestop_search_training
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# target_careers is curated reference data edited by hand; edits show up within 10 minutes
+_TARGET_CAREERS_TTL_SECONDS = 600
+_target_careers_cache: Optional[Tuple[float, List[Dict[str, Any]], List[Dict[str, Any]]]] = None
+_target_careers_lock = asyncio.Lock()
+
 
 class CareerMatchResponse(BaseModel):
     """Response model for career matches."""
@@ -21,47 +30,111 @@ class CareerMatchResponse(BaseModel):
     total_matches: int
 
 
+def _career_base_response(career: Dict[str, Any]) -> Dict[str, Any]:
+    """The per-career part of a /match entry; match fields are placeholders filled per user."""
+    return {
+        "id": career.get("id"),
+        "career_title": career.get("career_title"),
+        "description": career.get("description", ""),
+        "category": career.get("category", ""),
+        "match_score": None,
+        "transferable_skills": None,
+        "matching_required_skills": None,
+        "missing_skills": None,
+        "salary_range": career.get("median_salary_range", ""),
+        "growth_rate": career.get("national_growth_rate", ""),
+        "appalachian_demand_rating": career.get("appalachian_demand_rating", ""),
+        "appalachian_states": career.get("appalachian_states", []),
+        "required_certifications": career.get("required_certifications", []),
+        "entry_level_education": career.get("entry_level_education", ""),
+        # Location context (simplified - would use Google Maps API in production)
+        "local_demand_rating": career.get("appalachian_demand_rating", ""),
+        "commute_distance_miles": None,  # Would calculate with Google Maps
+        "commute_time_minutes": None,
+        "local_job_growth": career.get("certification_notes", "")
+    }
+
+
+async def _get_target_careers() -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """All target careers ordered by title plus their /match base responses, served from memory within the TTL.
+
+    Callers must treat the returned rows as read-only; they are shared across requests.
+    """
+    global _target_careers_cache
+    cached = _target_careers_cache
+    if cached is not None and cached[0] > time.monotonic():
+        return cached[1], cached[2]
+    async with _target_careers_lock:
+        # Another request may have reloaded while we waited for the lock
+        cached = _target_careers_cache
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1], cached[2]
+        result = await asyncio.to_thread(
+            get_supabase().table('target_careers').select('*').order('career_title').execute
+        )
+        careers = result.data or []
+        base_responses = [_career_base_response(career) for career in careers]
+        _target_careers_cache = (time.monotonic() + _TARGET_CAREERS_TTL_SECONDS, careers, base_responses)
+        return careers, base_responses
+
+
+def _persist_top_matches(user_id: str, matches: List[Dict[str, Any]]) -> None:
+    """Save the top career matches in one upsert (runs as a background task)."""
+    created_at = datetime.utcnow().isoformat()
+    match_rows = [
+        {
+            "user_id": user_id,
+            "career_title": match["career_title"],
+            "match_score": match["match_score"],
+            "required_skills": match["matching_required_skills"],
+            "missing_skills": match["missing_skills"],
+            "salary_range": match["salary_range"],
+            "growth_rate": match["growth_rate"],
+            "local_demand_rating": match["local_demand_rating"],
+            "commute_distance_miles": match["commute_distance_miles"],
+            "commute_time_minutes": match["commute_time_minutes"],
+            "local_job_growth": match["local_job_growth"],
+            "created_at": created_at
+        }
+        for match in matches
+    ]
+    try:
+        # Relies on the unique (user_id, career_title) index; existing rows keep their id
+        get_supabase().table('career_matches')\
+            .upsert(match_rows, on_conflict='user_id,career_title')\
+            .execute()
+    except Exception as e:
+        logger.error("Error saving career matches: %s", e)
+
+
 @router.get("/match", response_model=CareerMatchResponse)
-async def get_career_matches(request: Request):
+async def get_career_matches(
+    background_tasks: BackgroundTasks,
+    user_id: str = Depends(current_user_id)
+):
     """
     Get career matches for the current user based on their mining skills.
     
     Matches user's skills against curated target_careers table.
     """
-    # Get user from JWT token
-    from app.api.routes.auth import verify_jwt_token
-    
-    auth_header = request.headers.get('Authorization')
-    if not auth_header or not auth_header.startswith('Bearer '):
-        raise HTTPException(status_code=401, detail="Authentication required")
-    
-    token = auth_header.replace('Bearer ', '')
-    payload = verify_jwt_token(token)
-    user_id = payload['user_id']
-    
     supabase = get_supabase()
     
     try:
-        # Get user profile with skills
-        profile_result = supabase.table('user_profiles').select('*').eq('user_id', user_id).execute()
-        if not profile_result.data or len(profile_result.data) == 0:
+        # Get user profile with skills (sync client, so off the event loop) and all
+        # target careers (usually served from memory) concurrently
+        profile_result, (target_careers, base_responses) = await asyncio.gather(
+            asyncio.to_thread(
+                supabase.table('user_profiles').select('skills').eq('user_id', user_id).execute
+            ),
+            _get_target_careers(),
+        )
+        if not profile_result.data:
             raise HTTPException(status_code=404, detail="User profile not found. Please complete skill assessment first.")
         
         user_profile = profile_result.data[0]
         user_skills = user_profile.get('skills', []) or []
         
-        # Get user metadata for location
-        user_result = supabase.table('users').select('metadata').eq('id', user_id).execute()
-        user_metadata = {}
-        if user_result.data and len(user_result.data) > 0:
-            user_metadata = user_result.data[0].get('metadata', {}) or {}
-        
-        user_state = user_metadata.get('state')
-        # State is now directly stored (west_virginia, kentucky, pennsylvania)
-        
-        # Get all target careers
-        careers_result = supabase.table('target_careers').select('*').execute()
-        if not careers_result.data:
+        if not target_careers:
             logger.warning("No target careers found in database. Using fallback.")
             # Return empty or use fallback
             return CareerMatchResponse(
@@ -70,79 +143,26 @@ async def get_career_matches(request: Request):
                 total_matches=0
             )
         
-        target_careers = careers_result.data
-        
         # Match user skills to each target career
         matched_careers = []
-        for career in target_careers:
-            match_result = map_mining_skills_to_career(user_skills, career)
-            
+        match_results = map_mining_skills_to_careers(user_skills, target_careers)
+        for base, match_result in zip(base_responses, match_results):
             # Only include careers with match score > 30%
             if match_result["match_score"] >= 30:
-                career_match = {
-                    "id": career.get("id"),
-                    "career_title": career.get("career_title"),
-                    "description": career.get("description", ""),
-                    "category": career.get("category", ""),
+                matched_careers.append({
+                    **base,
                     "match_score": match_result["match_score"],
                     "transferable_skills": match_result["transferable_skills"],
                     "matching_required_skills": match_result["matching_required_skills"],
-                    "missing_skills": match_result["missing_skills"],
-                    "salary_range": career.get("median_salary_range", ""),
-                    "growth_rate": career.get("national_growth_rate", ""),
-                    "appalachian_demand_rating": career.get("appalachian_demand_rating", ""),
-                    "appalachian_states": career.get("appalachian_states", []),
-                    "required_certifications": career.get("required_certifications", []),
-                    "entry_level_education": career.get("entry_level_education", ""),
-                    # Location context (simplified - would use Google Maps API in production)
-                    "local_demand_rating": career.get("appalachian_demand_rating", ""),
-                    "commute_distance_miles": None,  # Would calculate with Google Maps
-                    "commute_time_minutes": None,
-                    "local_job_growth": career.get("certification_notes", "")
-                }
-                
-                matched_careers.append(career_match)
+                    "missing_skills": match_result["missing_skills"]
+                })
         
         # Sort by match score (highest first)
         matched_careers.sort(key=lambda x: x["match_score"], reverse=True)
         
-        # Save top matches to career_matches table
-        for i, match in enumerate(matched_careers[:5]):  # Save top 5
-            try:
-                match_data = {
-                    "user_id": user_id,
-                    "career_title": match["career_title"],
-                    "match_score": match["match_score"],
-                    "required_skills": match["matching_required_skills"],
-                    "missing_skills": match["missing_skills"],
-                    "salary_range": match["salary_range"],
-                    "growth_rate": match["growth_rate"],
-                    "local_demand_rating": match["local_demand_rating"],
-                    "commute_distance_miles": match["commute_distance_miles"],
-                    "commute_time_minutes": match["commute_time_minutes"],
-                    "local_job_growth": match["local_job_growth"],
-                    "created_at": datetime.utcnow().isoformat()
-                }
-                
-                # Check if match already exists
-                existing = supabase.table('career_matches')\
-                    .select('id')\
-                    .eq('user_id', user_id)\
-                    .eq('career_title', match["career_title"])\
-                    .execute()
-                
-                if existing.data and len(existing.data) > 0:
-                    # Update existing
-                    supabase.table('career_matches')\
-                        .update(match_data)\
-                        .eq('id', existing.data[0]['id'])\
-                        .execute()
-                else:
-                    # Create new
-                    supabase.table('career_matches').insert(match_data).execute()
-            except Exception as e:
-                logger.error(f"Error saving career match: {e}")
-                # Continue even if save fails
+        # Persist the top 5 after the response is sent; later reads only need them eventually
+        if matched_careers:
+            background_tasks.add_task(_persist_top_matches, user_id, matched_careers[:5])
         
         return CareerMatchResponse(
             careers=matched_careers,
@@ -153,23 +173,21 @@ async def get_career_matches(request: Request):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error fetching career matches: {e}", exc_info=True)
+        logger.exception("Error fetching career matches")
         raise HTTPException(status_code=500, detail=f"Failed to fetch career matches: {str(e)}")
 
 
 @router.get("/target-careers")
 async def get_target_careers():
     """Get all available target careers (for reference)."""
-    supabase = get_supabase()
-    
     try:
-        result = supabase.table('target_careers').select('*').order('career_title').execute()
+        careers, _ = await _get_target_careers()
         return {
             "success": True,
-            "careers": result.data or []
+            "careers": careers
         }
     except Exception as e:
-        logger.error(f"Error fetching target careers: {e}")
+        logger.error("Error fetching target careers: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -186,14 +204,14 @@ async def get_career_skills(career_title: str):
             .limit(1)\
             .execute()
         
-        if not result.data or len(result.data) == 0:
+        if not result.data:
             # Try exact match
             result = supabase.table('target_careers')\
                 .select('career_title, required_skills, transferable_mining_skills')\
                 .eq('career_title', career_title)\
                 .execute()
         
-        if not result.data or len(result.data) == 0:
+        if not result.data:
             return {
                 "success": True,
                 "career_title": career_title,
@@ -211,7 +229,7 @@ async def get_career_skills(career_title: str):
             "found": True
         }
     except Exception as e:
-        logger.error(f"Error fetching career skills: {e}")
+        logger.error("Error fetching career skills: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -235,7 +253,7 @@ class SelectTrainingProgramsRequest(BaseModel):
 @router.post("/training-programs")
 async def get_training_programs(
     request_body: TrainingProgramsRequest,
-    request: Request
+    user_id: str = Depends(current_user_id)
 ):
     """
     Fetch training programs from CareerOneStop based on job position, skills, and location.
@@ -245,17 +263,6 @@ async def get_training_programs(
     2. Searches CareerOneStop API for relevant training programs
     3. Returns programs that match the user's needs and location
     """
-    # Get user from JWT token
-    from app.api.routes.auth import verify_jwt_token
-    
-    auth_header = request.headers.get('Authorization')
-    if not auth_header or not auth_header.startswith('Bearer '):
-        raise HTTPException(status_code=401, detail="Authentication required")
-    
-    token = auth_header.replace('Bearer ', '')
-    payload = verify_jwt_token(token)
-    user_id = payload['user_id']
-    
     supabase = get_supabase()
     
     try:
@@ -269,11 +276,10 @@ async def get_training_programs(
         # Get user metadata for location if not provided
         zip_code = request_body.zip_code
         if not zip_code:
-            user_result = supabase.table('users').select('metadata').eq('id', user_id).execute()
-            if user_result.data and len(user_result.data) > 0:
-                user_metadata = user_result.data[0].get('metadata', {}) or {}
+            user_result = supabase.table('users').select('state:metadata->>state').eq('id', user_id).execute()
+            if user_result.data:
                 # Try to get state and convert to zip code
-                user_state = user_metadata.get('state')
+                user_state = user_result.data[0].get('state')
                 if user_state:
                     zip_code = STATE_ZIP_MAP.get(user_state)
         
@@ -288,15 +294,17 @@ async def get_training_programs(
         occupation = request_body.occupation_code or request_body.career_title
         
         # Search CareerOneStop for training programs
-        logger.info(f"Searching CareerOneStop for occupation='{occupation}', location='{zip_code}'")
-        result = careeronestop_search_training(
+        logger.info("Searching CareerOneStop for occupation='%s', location='%s'", occupation, zip_code)
+        # Sync HTTP call (cached per occupation/location); keep it off the event loop
+        result = await asyncio.to_thread(
+            careeronestop_search_training,
             occupation=occupation,
             location=zip_code,
             max_results=request_body.max_results
         )
         
         if result["status"] == "error":
-            logger.warning(f"CareerOneStop API error: {result.get('error_message')}")
+            logger.warning("CareerOneStop API error: %s", result.get('error_message'))
             # Return empty list instead of error - API might not be configured
             return {
                 "success": True,
@@ -328,7 +336,7 @@ async def get_training_programs(
                     
                     local_programs = local_result.data or []
             except Exception as e:
-                logger.warning(f"Error fetching local training programs: {e}")
+                logger.warning("Error fetching local training programs: %s", e)
         
         return {
             "success": True,
@@ -343,14 +351,14 @@ async def get_training_programs(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error fetching training programs: {e}", exc_info=True)
+        logger.exception("Error fetching training programs")
         raise HTTPException(status_code=500, detail=f"Failed to fetch training programs: {str(e)}")
 
 
 @router.post("/training-programs/select")
 async def select_training_programs(
     request_body: SelectTrainingProgramsRequest,
-    request: Request
+    user_id: str = Depends(current_user_id)
 ):
     """
     Save user's selected training programs for a career.
@@ -358,17 +366,6 @@ async def select_training_programs(
     This allows users to select which training programs they want to participate in,
     which will then be considered by the learning path generating agent.
     """
-    # Get user from JWT token
-    from app.api.routes.auth import verify_jwt_token
-    
-    auth_header = request.headers.get('Authorization')
-    if not auth_header or not auth_header.startswith('Bearer '):
-        raise HTTPException(status_code=401, detail="Authentication required")
-    
-    token = auth_header.replace('Bearer ', '')
-    payload = verify_jwt_token(token)
-    user_id = payload['user_id']
-    
     supabase = get_supabase()
     
     try:
@@ -381,7 +378,7 @@ async def select_training_programs(
             .eq('user_id', user_id)\
             .execute()
         
-        if not profile_result.data or len(profile_result.data) == 0:
+        if not profile_result.data:
             raise HTTPException(status_code=404, detail="User profile not found")
         
         # Update user profile with selected programs
@@ -412,7 +409,9 @@ async def select_training_programs(
             .eq('user_id', user_id)\
             .execute()
         
-        logger.info(f"User {user_id} selected {len(request_body.selected_programs)} programs for career {request_body.career_title}")
+        invalidate_user(user_id)
+        
+        logger.info("User %s selected %s programs for career %s", user_id, len(request_body.selected_programs), request_body.career_title)
         
         return {
             "success": True,
@@ -423,6 +422,6 @@ async def select_training_programs(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error saving selected training programs: {e}", exc_info=True)
+        logger.exception("Error saving selected training programs")
         raise HTTPException(status_code=500, detail=f"Failed to save selected programs: {str(e)}")
 
@@ -2,11 +2,12 @@
 API Routes for Learning Path Management
 """
 import logging
-from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 from datetime import datetime, date
 from app.core.supabase import get_supabase
+from app.api.routes.auth import current_user_id
 from supabase import Client
 import uuid
 
@@ -14,21 +15,6 @@ router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
-# Import get_current_user from auth routes
-async def get_current_user(request: Request):
-    """Get current user from JWT token"""
-    from app.api.routes.auth import verify_jwt_token
-    
-    auth_header = request.headers.get('Authorization')
-    if not auth_header or not auth_header.startswith('Bearer '):
-        raise HTTPException(status_code=401, detail="Authentication required")
-    
-    token = auth_header.replace('Bearer ', '')
-    payload = verify_jwt_token(token)
-    
-    return payload['user_id']
-
-
 class VideoItem(BaseModel):
     """Video item model."""
     video_id: str = Field(..., alias="videoId")
@@ -84,12 +70,11 @@ class UpdateProgressRequest(BaseModel):
 @router.post("/learning-paths", response_model=Dict[str, Any])
 async def create_learning_path(
     create_request: CreateLearningPathRequest,
-    request: Request
+    user_id: str = Depends(current_user_id)
 ) -> Dict[str, Any]:
     """Create a new learning path."""
-    user_id = await get_current_user(request)
-    logger.info(f"Creating learning path for user: {user_id}")
-    logger.info(f"Career ID: {create_request.career_id}, Career Title: {create_request.career_title}")
+    logger.info("Creating learning path for user: %s", user_id)
+    logger.info("Career ID: %s, Career Title: %s", create_request.career_id, create_request.career_title)
     supabase = get_supabase()
     
     try:
@@ -134,17 +119,17 @@ async def create_learning_path(
                     .eq("id", create_request.career_id)\
                     .execute()
                 
-                if career_check.data and len(career_check.data) > 0:
+                if career_check.data:
                     learning_path_data["career_id"] = create_request.career_id
-                    logger.info(f"Valid career_id found in career_matches: {create_request.career_id}")
+                    logger.info("Valid career_id found in career_matches: %s", create_request.career_id)
                 else:
-                    logger.warning(f"career_id '{create_request.career_id}' not found in career_matches table, skipping")
+                    logger.warning("career_id '%s' not found in career_matches table, skipping", create_request.career_id)
             except (ValueError, AttributeError) as e:
                 # Invalid UUID, skip it
-                logger.warning(f"Invalid UUID for career_id '{create_request.career_id}': {e}")
+                logger.warning("Invalid UUID for career_id '%s': %s", create_request.career_id, e)
         
-        logger.info(f"Inserting learning path data: user_id={user_id}, status=active, progress={progress}")
-        logger.info(f"Path data contains {len(path_data.get('scheduled_videos', []))} videos")
+        logger.info("Inserting learning path data: user_id=%s, status=active, progress=%s", user_id, progress)
+        logger.info("Path data contains %s videos", len(path_data.get('scheduled_videos', [])))
         
         result = supabase.table("learning_paths").insert(learning_path_data).execute()
         
@@ -157,16 +142,15 @@ async def create_learning_path(
         }
         
     except Exception as e:
-        logger.error(f"Error creating learning path: {str(e)}")
+        logger.error("Error creating learning path: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/learning-paths/current", response_model=Dict[str, Any])
 async def get_current_learning_path(
-    request: Request
+    user_id: str = Depends(current_user_id)
 ) -> Dict[str, Any]:
     """Get the user's current active learning path."""
-    user_id = await get_current_user(request)
     supabase = get_supabase()
     
     try:
@@ -179,7 +163,7 @@ async def get_current_learning_path(
             .limit(1)\
             .execute()
         
-        if not result.data or len(result.data) == 0:
+        if not result.data:
             return {
                 "success": True,
                 "data": None
@@ -191,16 +175,15 @@ async def get_current_learning_path(
         }
         
     except Exception as e:
-        logger.error(f"Error fetching learning path: {str(e)}")
+        logger.error("Error fetching learning path: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/learning-paths", response_model=Dict[str, Any])
 async def get_all_learning_paths(
-    request: Request
+    user_id: str = Depends(current_user_id)
 ) -> Dict[str, Any]:
     """Get all learning paths for a user."""
-    user_id = await get_current_user(request)
     supabase = get_supabase()
     
     try:
@@ -216,7 +199,7 @@ async def get_all_learning_paths(
         }
         
     except Exception as e:
-        logger.error(f"Error fetching learning paths: {str(e)}")
+        logger.error("Error fetching learning paths: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -224,10 +207,9 @@ async def get_all_learning_paths(
 async def update_video_progress(
     path_id: str,
     update_request: UpdateProgressRequest,
-    request: Request
+    user_id: str = Depends(current_user_id)
 ) -> Dict[str, Any]:
     """Update progress for a specific video."""
-    user_id = await get_current_user(request)
     supabase = get_supabase()
     
     try:
@@ -238,7 +220,7 @@ async def update_video_progress(
             .eq("user_id", user_id)\
             .execute()
         
-        if not result.data or len(result.data) == 0:
+        if not result.data:
             raise HTTPException(status_code=404, detail="Learning path not found")
         
         learning_path = result.data[0]
@@ -296,7 +278,7 @@ async def update_video_progress(
                 if delta_days >= 0:
                     week_number = delta_days // 7 + 1
         except Exception as e:
-            logger.warning(f"Failed to calculate week_number, defaulting to 1: {e}")
+            logger.warning("Failed to calculate week_number, defaulting to 1: %s", e)
 
         progress_data = {
             "user_id": user_id,
@@ -320,7 +302,7 @@ async def update_video_progress(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error updating progress: {str(e)}")
+        logger.error("Error updating progress: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -334,10 +316,9 @@ class UpdateVideosRequest(BaseModel):
 async def update_learning_path_videos(
     path_id: str,
     update_request: UpdateVideosRequest,
-    request: Request
+    user_id: str = Depends(current_user_id)
 ) -> Dict[str, Any]:
     """Update the videos/path_data of a learning path."""
-    user_id = await get_current_user(request)
     supabase = get_supabase()
     
     try:
@@ -362,7 +343,7 @@ async def update_learning_path_videos(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error updating learning path videos: {str(e)}")
+        logger.error("Error updating learning path videos: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -370,10 +351,9 @@ async def update_learning_path_videos(
 async def update_learning_path_status(
     path_id: str,
     status: str,
-    request: Request
+    user_id: str = Depends(current_user_id)
 ) -> Dict[str, Any]:
     """Update the status of a learning path."""
-    user_id = await get_current_user(request)
     supabase = get_supabase()
     
     if status not in ["active", "completed", "paused"]:
@@ -400,17 +380,16 @@ async def update_learning_path_status(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error updating status: {str(e)}")
+        logger.error("Error updating status: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.delete("/learning-paths/{path_id}", response_model=Dict[str, Any])
 async def delete_learning_path(
     path_id: str,
-    request: Request
+    user_id: str = Depends(current_user_id)
 ) -> Dict[str, Any]:
     """Delete a learning path."""
-    user_id = await get_current_user(request)
     supabase = get_supabase()
     
     try:
@@ -426,6 +405,6 @@ async def delete_learning_path(
         }
         
     except Exception as e:
-        logger.error(f"Error deleting learning path: {str(e)}")
+        logger.error("Error deleting learning path: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
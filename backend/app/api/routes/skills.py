@@ -13,6 +13,7 @@ from app.services.conversational_assessment import (
 from app.services.session_manager import session_manager
 from app.services.mining_skill_mapper import extract_transferable_skills
 from app.core.supabase import get_supabase
+from app.core.user_cache import invalidate_user
 
 router = APIRouter()
 
@@ -80,7 +81,7 @@ def save_skill_profile_to_database(
         # Check if session exists
         existing_session = supabase.table('assessment_sessions').select('id').eq('id', session_id).execute()
         
-        if existing_session.data and len(existing_session.data) > 0:
+        if existing_session.data:
             # Update existing session
             supabase.table('assessment_sessions').update(session_data).eq('id', session_id).execute()
         else:
@@ -129,29 +130,28 @@ def save_skill_profile_to_database(
         # Note: Detailed skills with O*NET codes are already saved in assessment_sessions table
         # We don't need to duplicate them in user_profiles.metadata
         
-        # Check if profile exists
-        existing_profile = supabase.table('user_profiles').select('user_id').eq('user_id', user_id).execute()
+        # Check if profile exists (and read the skills/tools to merge in the same request)
+        current_profile = supabase.table('user_profiles').select('skills,tools').eq('user_id', user_id).execute()
         
-        if existing_profile.data and len(existing_profile.data) > 0:
+        if current_profile.data:
             # Update existing profile - merge with existing skills
-            current_profile = supabase.table('user_profiles').select('*').eq('user_id', user_id).execute()
-            if current_profile.data:
-                current_skills = current_profile.data[0].get('skills', []) or []
-                current_tools = current_profile.data[0].get('tools', []) or []
-                
-                # Merge skills (avoid duplicates)
-                merged_skills = list(set(current_skills + skills_list))
-                merged_tools = list(set(current_tools + tools_list))
-                
-                profile_data['skills'] = merged_skills
-                profile_data['tools'] = merged_tools
-                
-                # Update profile
-                supabase.table('user_profiles').update(profile_data).eq('user_id', user_id).execute()
+            current_skills = current_profile.data[0].get('skills', []) or []
+            current_tools = current_profile.data[0].get('tools', []) or []
+            
+            # Merge skills (avoid duplicates)
+            merged_skills = list(set(current_skills + skills_list))
+            merged_tools = list(set(current_tools + tools_list))
+            
+            profile_data['skills'] = merged_skills
+            profile_data['tools'] = merged_tools
+            
+            # Update profile
+            supabase.table('user_profiles').update(profile_data).eq('user_id', user_id).execute()
         else:
             # Create new profile
             profile_data['created_at'] = datetime.utcnow().isoformat()
             supabase.table('user_profiles').insert(profile_data).execute()
+        invalidate_user(user_id)
         
         return {
             'session_saved': True,
@@ -164,7 +164,7 @@ def save_skill_profile_to_database(
         # Log error but don't fail the request
         import logging
         logger = logging.getLogger(__name__)
-        logger.error(f"Failed to save skill profile to database: {e}", exc_info=True)
+        logger.exception("Failed to save skill profile to database")
         return {
             'session_saved': False,
             'profile_saved': False,
@@ -222,9 +222,9 @@ async def assess_conversation(request: AssessmentRequest):
                 import logging
                 logger = logging.getLogger(__name__)
                 if save_result.get('session_saved') and save_result.get('profile_saved'):
-                    logger.info(f"Skill profile saved successfully for user {request.user_id}")
+                    logger.info("Skill profile saved successfully for user %s", request.user_id)
                 else:
-                    logger.warning(f"Failed to save skill profile: {save_result.get('error')}")
+                    logger.warning("Failed to save skill profile: %s", save_result.get('error'))
         elif result.get("next_turn"):
             session.advance_turn()
         
@@ -317,6 +317,7 @@ async def clear_assessment(request: Request):
             'tools': None,
             'updated_at': datetime.utcnow().isoformat()
         }).eq('user_id', user_id).execute()
+        invalidate_user(user_id)
         
         # Also clear any mining questionnaire responses
         supabase.table('mining_questionnaire_responses').delete().eq('user_id', user_id).execute()
@@ -401,13 +402,14 @@ async def save_skill_profile(request: Dict[str, Any]):
         # Check if profile exists
         existing_profile = supabase.table('user_profiles').select('user_id').eq('user_id', user_id).execute()
         
-        if existing_profile.data and len(existing_profile.data) > 0:
+        if existing_profile.data:
             # Update existing profile
             supabase.table('user_profiles').update(profile_data).eq('user_id', user_id).execute()
         else:
             # Create new profile
             profile_data['created_at'] = datetime.utcnow().isoformat()
             supabase.table('user_profiles').insert(profile_data).execute()
+        invalidate_user(user_id)
         
         return {
             "success": True,
@@ -417,7 +419,7 @@ async def save_skill_profile(request: Dict[str, Any]):
         
     except Exception as e:
         logger = logging.getLogger(__name__)
-        logger.error(f"Error saving skill profile: {e}", exc_info=True)
+        logger.exception("Error saving skill profile")
         raise HTTPException(status_code=500, detail=f"Failed to save skill profile: {str(e)}")
 
 
@@ -435,7 +437,7 @@ async def get_user_skill_profile(user_id: str):
         all_sessions = supabase.table('assessment_sessions').select('*').eq('user_id', user_id).eq('status', 'completed').execute()
         
         # Sort manually by updated_at descending and take the first one
-        if all_sessions.data and len(all_sessions.data) > 0:
+        if all_sessions.data:
             sorted_sessions = sorted(
                 all_sessions.data,
                 key=lambda x: x.get('updated_at', ''),
@@ -452,7 +454,7 @@ async def get_user_skill_profile(user_id: str):
                 "extracted_skills": session.get('extracted_skills', []),
                 "messages": session.get('messages', []),
                 "updated_at": session.get('updated_at'),
-                "user_profile": profile.data[0] if profile.data and len(profile.data) > 0 else None
+                "user_profile": profile.data[0] if profile.data else None
             }
         else:
             # Check if user has a profile but no assessment
@@ -460,11 +462,11 @@ async def get_user_skill_profile(user_id: str):
             
             return {
                 "has_assessment": False,
-                "user_profile": profile.data[0] if profile.data and len(profile.data) > 0 else None
+                "user_profile": profile.data[0] if profile.data else None
             }
     except Exception as e:
         logger = logging.getLogger(__name__)
-        logger.error(f"Error fetching skill profile: {e}", exc_info=True)
+        logger.exception("Error fetching skill profile")
         raise HTTPException(status_code=500, detail=f"Failed to fetch skill profile: {str(e)}")
 
 
@@ -557,13 +559,13 @@ async def submit_mining_questionnaire(request: MiningQuestionnaireRequest):
             # Save questionnaire responses
             supabase.table('mining_questionnaire_responses').insert(questionnaire_response_data).execute()
         except Exception as e:
-            logger.warning(f"Could not save to mining_questionnaire_responses (table may not exist yet): {e}")
+            logger.warning("Could not save to mining_questionnaire_responses (table may not exist yet): %s", e)
         
         try:
             # Save assessment session
             supabase.table('assessment_sessions').insert(assessment_session_data).execute()
         except Exception as e:
-            logger.warning(f"Could not save assessment session: {e}")
+            logger.warning("Could not save assessment session: %s", e)
         
         # Update user profile with mining-specific data and skills
         profile_data = {
@@ -583,13 +585,14 @@ async def submit_mining_questionnaire(request: MiningQuestionnaireRequest):
         # Check if profile exists
         existing_profile = supabase.table('user_profiles').select('user_id').eq('user_id', request.user_id).execute()
         
-        if existing_profile.data and len(existing_profile.data) > 0:
+        if existing_profile.data:
             # Update existing profile
             supabase.table('user_profiles').update(profile_data).eq('user_id', request.user_id).execute()
         else:
             # Create new profile
             profile_data['created_at'] = datetime.utcnow().isoformat()
             supabase.table('user_profiles').insert(profile_data).execute()
+        invalidate_user(request.user_id)
         
         return {
             "success": True,
@@ -600,7 +603,7 @@ async def submit_mining_questionnaire(request: MiningQuestionnaireRequest):
         }
         
     except Exception as e:
-        logger.error(f"Error processing mining questionnaire: {e}", exc_info=True)
+        logger.exception("Error processing mining questionnaire")
         raise HTTPException(status_code=500, detail=f"Failed to process questionnaire: {str(e)}")
 
 
@@ -63,7 +63,7 @@ async def evaluate_subsidy(body: SubsidyRequest) -> Dict[str, Any]:
         "Use this context to complete the eligibility and documentation research tasks."
     )
     
-    logger.info(f"Starting subsidy evaluation for grant: {body.grant_name}")
+    logger.info("Starting subsidy evaluation for grant: %s", body.grant_name)
 
     # Generate unique session ID to avoid state conflicts
     import uuid
@@ -81,7 +81,7 @@ async def evaluate_subsidy(body: SubsidyRequest) -> Dict[str, Any]:
         try:
             await SESSION_SERVICE.create_session(app_name=APP_NAME, user_id=body.user_id, session_id=unique_session_id)
         except Exception as e:
-            logger.warning(f"Session creation warning: {e}")
+            logger.warning("Session creation warning: %s", e)
 
         async for event in runner.run_async(user_id=body.user_id, session_id=unique_session_id, new_message=content):
             # Log all events for debugging
@@ -90,23 +90,23 @@ async def evaluate_subsidy(body: SubsidyRequest) -> Dict[str, Any]:
                 for part in parts:
                     if hasattr(part, "text") and part.text:
                         all_responses.append(part.text)
-                        logger.info(f"Agent response part: {part.text[:200]}...")
+                        logger.info("Agent response part: %s...", part.text[:200])
             
             if hasattr(event, "is_final_response") and event.is_final_response():
                 parts = getattr(getattr(event, "content", None), "parts", None) or []
                 if parts and hasattr(parts[0], "text"):
                     final_text = parts[0].text
-                    logger.info(f"Final response received: {final_text[:500]}...")
+                    logger.info("Final response received: %s...", final_text[:500])
                     
     except Exception as e:
-        logger.error(f"Agent run failed: {str(e)}")
+        logger.error("Agent run failed: %s", e)
         raise HTTPException(status_code=500, detail=f"Agent run failed: {str(e)}")
 
     if not final_text:
         # Try to use the last response if no final response was marked
         if all_responses:
             final_text = all_responses[-1]
-            logger.info(f"Using last response as final: {final_text[:500]}...")
+            logger.info("Using last response as final: %s...", final_text[:500])
         else:
             raise HTTPException(status_code=500, detail="No response from agent")
 
@@ -114,16 +114,16 @@ async def evaluate_subsidy(body: SubsidyRequest) -> Dict[str, Any]:
     parsed: Dict[str, Any]
     try:
         parsed = json.loads(final_text)
-        logger.info(f"Parsed JSON successfully: {list(parsed.keys())}")
+        logger.info("Parsed JSON successfully: %s", list(parsed.keys()))
     except Exception:
         # Try to extract JSON code block
         m = re.search(r"```(?:json)?\s*(\{[\s\S]*?\})\s*```", final_text)
         if m:
             try:
                 parsed = json.loads(m.group(1))
-                logger.info(f"Parsed JSON from code block: {list(parsed.keys())}")
+                logger.info("Parsed JSON from code block: %s", list(parsed.keys()))
             except Exception:
-                logger.error(f"Failed to parse JSON from code block")
+                logger.error("Failed to parse JSON from code block")
                 parsed = {"status": "error", "error_message": "Failed to parse agent response", "raw": final_text}
         else:
             # Try to find any JSON object in the response
@@ -131,12 +131,12 @@ async def evaluate_subsidy(body: SubsidyRequest) -> Dict[str, Any]:
             if m2:
                 try:
                     parsed = json.loads(m2.group(1))
-                    logger.info(f"Parsed JSON from raw text: {list(parsed.keys())}")
+                    logger.info("Parsed JSON from raw text: %s", list(parsed.keys()))
                 except Exception:
-                    logger.error(f"Failed to parse any JSON from response")
+                    logger.error("Failed to parse any JSON from response")
                     parsed = {"status": "error", "error_message": "Failed to parse agent response", "raw": final_text}
             else:
-                logger.error(f"No JSON found in response")
+                logger.error("No JSON found in response")
                 parsed = {"status": "error", "error_message": "Failed to parse agent response", "raw": final_text}
 
     # Ensure required fields are present even if empty
@@ -151,6 +151,6 @@ async def evaluate_subsidy(body: SubsidyRequest) -> Dict[str, Any]:
     if "status" not in parsed:
         parsed["status"] = "success"
 
-    logger.info(f"Returning response with {len(parsed.get('checklist', []))} checklist items and {len(parsed.get('documents', []))} documents")
+    logger.info("Returning response with %s checklist items and %s documents", len(parsed.get('checklist', [])), len(parsed.get('documents', [])))
     
     return {"status": "success", "data": parsed}
@@ -168,7 +168,7 @@ async def get_programs_from_database(supabase, user_state: str) -> List[Dict[str
         ).eq('is_active', True).execute()
         
         if result.data:
-            logger.info(f"Found {len(result.data)} cached programs in database for {user_state}")
+            logger.info("Found %s cached programs in database for %s", len(result.data), user_state)
             programs = []
             for record in result.data:
                 programs.append({
@@ -184,7 +184,7 @@ async def get_programs_from_database(supabase, user_state: str) -> List[Dict[str
             return programs
         return []
     except Exception as e:
-        logger.error(f"Error fetching from database: {str(e)}")
+        logger.error("Error fetching from database: %s", e)
         return []
 
 
@@ -227,9 +227,9 @@ async def save_programs_to_database(supabase, programs: List[Dict[str, Any]], us
                 # Insert new
                 supabase.table('training_programs').insert(program_data).execute()
         
-        logger.info(f"Saved/updated {len(programs)} programs to database for {user_state}")
+        logger.info("Saved/updated %s programs to database for %s", len(programs), user_state)
     except Exception as e:
-        logger.error(f"Error saving to database: {str(e)}")
+        logger.error("Error saving to database: %s", e)
         # Don't fail request if save fails
 
 
@@ -272,7 +272,7 @@ async def get_coal_miner_training_programs(
         # Get user metadata
         user_result = supabase.table('users').select('metadata').eq('id', user_id).execute()
         user_metadata = {}
-        if user_result.data and len(user_result.data) > 0:
+        if user_result.data:
             user_metadata = user_result.data[0].get('metadata', {}) or {}
         
         # Get user's state
@@ -286,13 +286,13 @@ async def get_coal_miner_training_programs(
         state_name = STATE_NAMES.get(user_state, user_state)
         
         # STEP 1: Try database first (fast)
-        logger.info(f"Checking database for cached programs in {state_name}")
+        logger.info("Checking database for cached programs in %s", state_name)
         programs_list = await get_programs_from_database(supabase, user_state)
         data_source = "cached"
         
         # STEP 2: If no cache, perform live search
         if not programs_list:
-            logger.info(f"No cache found. Performing live search for {state_name}")
+            logger.info("No cache found. Performing live search for %s", state_name)
             
             # Check API keys
             if not settings.serper_api_key:
@@ -324,10 +324,10 @@ async def get_coal_miner_training_programs(
             
             # Save to database for future use
             if programs_list:
-                logger.info(f"Saving {len(programs_list)} programs to database")
+                logger.info("Saving %s programs to database", len(programs_list))
                 await save_programs_to_database(supabase, programs_list, user_state)
         else:
-            logger.info(f"Using {len(programs_list)} cached programs")
+            logger.info("Using %s cached programs", len(programs_list))
         
         # Prepare user data for relevance scoring
         user_data = {
@@ -376,7 +376,7 @@ async def get_coal_miner_training_programs(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error fetching training programs: {str(e)}")
+        logger.error("Error fetching training programs: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"Failed to fetch training programs: {str(e)}"
@@ -423,7 +423,7 @@ async def force_live_search_training_programs(
         # Get user metadata
         user_result = supabase.table('users').select('metadata').eq('id', user_id).execute()
         user_metadata = {}
-        if user_result.data and len(user_result.data) > 0:
+        if user_result.data:
             user_metadata = user_result.data[0].get('metadata', {}) or {}
         
         # Get user's state
@@ -436,7 +436,7 @@ async def force_live_search_training_programs(
         
         state_name = STATE_NAMES.get(user_state, user_state)
         
-        logger.info(f"🔄 FORCE REFRESH: Live search for training programs in {state_name}")
+        logger.info("🔄 FORCE REFRESH: Live search for training programs in %s", state_name)
         
         # Check API keys
         if not settings.serper_api_key:
@@ -463,11 +463,11 @@ async def force_live_search_training_programs(
             programs_list = (search_results.get('career_specific_programs', []) + 
                            search_results.get('general_programs', []))
         
-        logger.info(f"Found {len(programs_list)} programs in live search")
+        logger.info("Found %s programs in live search", len(programs_list))
         
         # Save/update database
         if programs_list:
-            logger.info(f"Updating database with {len(programs_list)} programs")
+            logger.info("Updating database with %s programs", len(programs_list))
             await save_programs_to_database(supabase, programs_list, user_state)
         
         # Prepare user data for relevance scoring
@@ -514,7 +514,7 @@ async def force_live_search_training_programs(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error in forced live search: {str(e)}")
+        logger.error("Error in forced live search: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"Live search failed: {str(e)}"
@@ -563,7 +563,7 @@ async def search_career_specific_training(
         # Get user metadata
         user_result = supabase.table('users').select('metadata').eq('id', user_id).execute()
         user_metadata = {}
-        if user_result.data and len(user_result.data) > 0:
+        if user_result.data:
             user_metadata = user_result.data[0].get('metadata', {}) or {}
         
         # Get user's state
@@ -574,7 +574,7 @@ async def search_career_specific_training(
                 detail="State information required. Please complete your onboarding profile."
             )
         
-        logger.info(f"🎯 Career-specific search using ADK: {request_body.career_title} in {user_state}")
+        logger.info("🎯 Career-specific search using ADK: %s in %s", request_body.career_title, user_state)
         
         # Check API keys
         if not settings.serper_api_key:
@@ -616,7 +616,7 @@ async def search_career_specific_training(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error in career-specific search: {str(e)}", exc_info=True)
+        logger.exception("Error in career-specific search")
         raise HTTPException(
             status_code=500,
             detail=f"Career-specific search failed: {str(e)}"
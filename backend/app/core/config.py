@@ -8,6 +8,11 @@ class Settings(BaseSettings):
     supabase_url: str
     supabase_service_role_key: str
     supabase_anon_key: Optional[str] = None
+    # Optional direct Postgres DSN for asyncpg (hot read paths bypass PostgREST)
+    supabase_db_url: Optional[str] = None
+    # Optional Supavisor transaction-mode pooler DSN (port 6543); preferred over
+    # supabase_db_url when set, so many workers share a few server connections
+    supabase_pooler_url: Optional[str] = None
 
     # ---------- Google OAuth ----------
     google_client_id: Optional[str] = None
@@ -18,6 +23,9 @@ class Settings(BaseSettings):
     jwt_secret_key: str = "your-secret-key-change-in-production"
     jwt_algorithm: str = "HS256"
     jwt_expiration_minutes: int = 10080  # 7 days
+    # How long a verified token is trusted from the in-process cache (kept short so
+    # revocations / secret rotation take effect quickly)
+    jwt_cache_ttl_seconds: int = 30
 
     # ---------- Frontend ----------
     frontend_url: str = "http://localhost:5173"
@@ -27,6 +35,11 @@ class Settings(BaseSettings):
     google_api_key: Optional[str] = None
     google_cloud_project: Optional[str] = None
     google_cloud_location: str = "us-central1"
+    # SQLAlchemy URL for persistent ADK sessions shared across workers
+    # (e.g. postgresql+psycopg2://... or sqlite:///adk_sessions.db); in-memory when unset
+    adk_session_db_url: Optional[str] = None
+    # Max agent runs executing at once per process (LLM/tool fan-out budget)
+    agent_max_concurrent_runs: int = 16
 
     # ---------- YouTube ----------
     youtube_api_key: Optional[str] = None
@@ -0,0 +1,66 @@
+"""
+Direct Postgres access (asyncpg) for hot read paths.
+
+The Supabase client talks to PostgREST over synchronous HTTP, which blocks the
+event loop for every round-trip. When ``SUPABASE_POOLER_URL`` or
+``SUPABASE_DB_URL`` is configured, a shared asyncpg pool is opened on startup
+and callers can query Postgres directly; otherwise ``get_pg_pool()`` returns
+``None`` and callers fall back to the Supabase client.
+
+The Supavisor transaction pooler is preferred when both are set. It hands out
+a server connection per transaction, so prepared statements cannot be reused
+across queries and asyncpg's statement cache is disabled for it.
+"""
+import json
+import logging
+from typing import Optional
+
+import asyncpg
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_pool: Optional[asyncpg.Pool] = None
+
+
+async def _init_connection(conn: asyncpg.Connection) -> None:
+    """Decode json/jsonb columns to Python objects like PostgREST does."""
+    for type_name in ("json", "jsonb"):
+        await conn.set_type_codec(
+            type_name, encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
+        )
+
+
+async def open_pg_pool() -> None:
+    """Open the shared pool if a database URL is configured."""
+    global _pool
+    dsn = settings.supabase_pooler_url or settings.supabase_db_url
+    if _pool is not None or not dsn:
+        return
+    try:
+        _pool = await asyncpg.create_pool(
+            dsn=dsn,
+            min_size=5,
+            max_size=20,
+            init=_init_connection,
+            # Transaction-mode pooling cannot keep prepared statements between queries
+            statement_cache_size=0 if settings.supabase_pooler_url else 100,
+        )
+        logger.info("Opened asyncpg pool")
+    except Exception as e:
+        # Keep serving through the Supabase client if Postgres is unreachable
+        logger.warning("Could not open asyncpg pool, falling back to Supabase REST: %s", e)
+        _pool = None
+
+
+async def close_pg_pool() -> None:
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+def get_pg_pool() -> Optional[asyncpg.Pool]:
+    """Return the shared pool, or None when direct Postgres access is disabled."""
+    return _pool
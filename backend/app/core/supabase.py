@@ -1,7 +1,21 @@
 from functools import lru_cache
-from supabase import create_client, Client
+
+import httpx
+from supabase import create_client, Client, ClientOptions
 from app.core.config import settings
 
+# Routes call the client from asyncio.to_thread (up to 32 default-executor workers);
+# keep that many connections alive so concurrent calls reuse warm TLS connections
+_HTTP_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32)
+
 @lru_cache(maxsize=1)
 def get_supabase() -> Client:
-    return create_client(settings.supabase_url, settings.supabase_service_role_key)
\ No newline at end of file
+    """Process-wide Supabase client: built on first call, then returned from the cache.
+
+    Cheap and idempotent, so routes call it per request instead of holding a reference.
+    """
+    return create_client(
+        settings.supabase_url,
+        settings.supabase_service_role_key,
+        options=ClientOptions(httpx_client=httpx.Client(limits=_HTTP_LIMITS, timeout=120.0)),
+    )
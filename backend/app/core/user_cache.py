@@ -0,0 +1,38 @@
+"""
+Per-user read caches and their shared invalidation.
+
+Three short-lived caches are keyed by user_id:
+
+* ``USER_SUMMARY_CACHE`` holds the /auth/me user summary.
+* ``USER_PROFILE_CACHE`` holds the GET /auth/user/profile response, which embeds
+  user_profiles.
+* The agent context (onboarding metadata plus selected training programs) is
+  kept here for agent turns, which arrive in bursts per user.
+
+Any route that writes a user's users or user_profiles rows calls
+``invalidate_user`` afterwards, so the next read reloads. The caches live in core
+so that the writing routes don't import the auth or agent route modules.
+"""
+from typing import Any, Optional
+
+from cachetools import TTLCache
+
+USER_SUMMARY_CACHE: TTLCache = TTLCache(maxsize=10_000, ttl=30)
+USER_PROFILE_CACHE: TTLCache = TTLCache(maxsize=10_000, ttl=10)
+_USER_CONTEXT_CACHE: TTLCache = TTLCache(maxsize=4096, ttl=120)
+
+
+def get_user_context(user_id: str) -> Optional[Any]:
+    """Return the cached agent context for a user, or None on a miss."""
+    return _USER_CONTEXT_CACHE.get(user_id)
+
+
+def set_user_context(user_id: str, context: Any) -> None:
+    _USER_CONTEXT_CACHE[user_id] = context
+
+
+def invalidate_user(user_id: str) -> None:
+    """Drop every cached view of a user after their users/user_profiles rows change."""
+    USER_SUMMARY_CACHE.pop(user_id, None)
+    USER_PROFILE_CACHE.pop(user_id, None)
+    _USER_CONTEXT_CACHE.pop(user_id, None)
@@ -1,9 +1,47 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+import httpx
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.router import router as api_router
+from app.api.routes.agent import build_runner, drain_jobs, sweep_jobs
+from app.api.routes.auth import probe_user_schema
 from app.core.config import settings, configure_adk_env
+from app.core.db import open_pg_pool, close_pg_pool
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Bounded pool for blocking Supabase calls offloaded with asyncio.to_thread
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=32))
+    await open_pg_pool()
+    await asyncio.to_thread(probe_user_schema)
+    app.state.runner = build_runner()
+    # Shared outbound client: keep-alive (and HTTP/2) connections to Google APIs.
+    # http2/limits live on the transport, which httpx uses instead of the client's own.
+    app.state.http = httpx.AsyncClient(
+        timeout=httpx.Timeout(10.0, connect=3.0, write=5.0, pool=2.0),
+        transport=httpx.AsyncHTTPTransport(
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=50, max_connections=200, keepalive_expiry=30.0),
+            # Retries connection failures only (never a request that was sent)
+            retries=1,
+        ),
+    )
+    app.state.tasks = set()
+    job_sweeper = asyncio.create_task(sweep_jobs())
+    yield
+    job_sweeper.cancel()
+    await drain_jobs(app.state.tasks)
+    await app.state.http.aclose()
+    await close_pg_pool()
+
 
-app = FastAPI(title="SkillBridge API")
+# orjson serializes every JSON response (FastAPI has already made the content JSON-compatible)
+app = FastAPI(title="SkillBridge API", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 
 configure_adk_env()
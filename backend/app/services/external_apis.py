@@ -5,8 +5,11 @@ This module provides functions to interact with external APIs for finding
 training programs, certifications, and learning opportunities.
 """
 
+import copy
 import logging
+import threading
 import httpx
+from cachetools import TTLCache
 from typing import Optional, Dict, List, Any
 from app.core.config import settings
 
@@ -21,6 +24,11 @@ if not logger.handlers:
     logger.addHandler(_handler)
 logger.setLevel(logging.INFO)
 
+# Training Finder results for an (occupation, location) change over days, not seconds;
+# shared by the careers route and the resource finder agent (which calls from worker threads)
+_TRAINING_CACHE: TTLCache = TTLCache(maxsize=5000, ttl=86400)
+_TRAINING_CACHE_LOCK = threading.Lock()
+
 
 def careeronestop_search_training(
     occupation: str,
@@ -58,6 +66,15 @@ def careeronestop_search_training(
     # CareerOneStop API requires userId in URL path (may be separate from API token)
     userId = user_id or settings.careeronestop_user_id or api_key
     
+    # Only successful searches are cached, so a transient API error is retried next call
+    cache_key = (occupation.strip().lower(), location.strip(), max_results, userId)
+    with _TRAINING_CACHE_LOCK:
+        cached = _TRAINING_CACHE.get(cache_key)
+    if cached is not None:
+        logger.info("CareerOneStop cache hit: occupation='%s', location='%s'", occupation, location)
+        # Callers may modify the result (e.g. merge in local programs); never hand out the cached object
+        return copy.deepcopy(cached)
+    
     # CareerOneStop Training Finder API endpoint
     # Format: /v1/training/{userId}/{occupation}/{location}
     # Location can be ZIP code (5 digits) or "City, State"
@@ -98,10 +115,13 @@ def careeronestop_search_training(
         
         logger.info("CareerOneStop search returned %d programs", len(programs))
         
-        return {
+        result = {
             "status": "success",
             "programs": programs[:max_results] if programs else []
         }
+        with _TRAINING_CACHE_LOCK:
+            _TRAINING_CACHE[cache_key] = copy.deepcopy(result)
+        return result
     except Exception as e:
         logger.error("CareerOneStop search failed: %s", str(e))
         return {
@@ -3,7 +3,8 @@ Mining Skill Mapping Service
 
 Maps mining-specific skills and experiences to transferable skills for target careers.
 """
-from typing import Dict, List, Any, Set
+from functools import lru_cache
+from typing import Dict, List, Any, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
@@ -157,48 +158,32 @@ def extract_transferable_skills(questionnaire_data: Dict[str, Any]) -> List[str]
     return sorted(list(skills))
 
 
-def map_mining_skills_to_career(
-    user_skills: List[str],
-    target_career: Dict[str, Any]
-) -> Dict[str, Any]:
-    """
-    Map user's mining skills to a target career and calculate match.
-    
-    Args:
-        user_skills: List of user's transferable skills
-        target_career: Target career dictionary with required_skills and transferable_mining_skills
-        
-    Returns:
-        Dictionary with match_score, transferable_skills, missing_skills
-    """
-    user_skills_set = set(skill.lower() for skill in user_skills)
+@lru_cache(maxsize=4096)
+def _skill_terms(skill: str, min_keyword_len: int) -> Tuple[str, Tuple[str, ...]]:
+    """Lowercased skill plus its match keywords; career skills are a small fixed vocabulary."""
+    skill_lower = skill.lower()
+    return skill_lower, tuple(k for k in skill_lower.split() if len(k) > min_keyword_len)
+
+
+def _find_matching(skills: List[str], user_lowers: List[str], min_keyword_len: int) -> List[str]:
+    """Return the skills (in order) that some user skill matches exactly or by keyword."""
+    found = []
+    for skill in skills:
+        skill_lower, keywords = _skill_terms(skill, min_keyword_len)
+        for user_lower in user_lowers:
+            if skill_lower == user_lower or any(keyword in user_lower for keyword in keywords):
+                found.append(skill)
+                break
+    return found
+
+
+def _match_career(user_lowers: List[str], target_career: Dict[str, Any]) -> Dict[str, Any]:
     required_skills = target_career.get("required_skills", [])
     transferable_mining_skills = target_career.get("transferable_mining_skills", [])
     
-    # Find skills that match required skills
-    matching_skills = []
-    for req_skill in required_skills:
-        req_lower = req_skill.lower()
-        for user_skill in user_skills:
-            user_lower = user_skill.lower()
-            # Check for exact match or keyword match
-            if req_lower == user_lower or any(
-                keyword in user_lower for keyword in req_lower.split() if len(keyword) > 2
-            ):
-                matching_skills.append(req_skill)
-                break
-    
-    # Find transferable mining skills that user has
-    transferable_found = []
-    for trans_skill in transferable_mining_skills:
-        trans_lower = trans_skill.lower()
-        for user_skill in user_skills:
-            user_lower = user_skill.lower()
-            if trans_lower == user_lower or any(
-                keyword in user_lower for keyword in trans_lower.split() if len(keyword) > 3
-            ):
-                transferable_found.append(trans_skill)
-                break
+    # Required skills match on keywords longer than 2 chars, transferable ones on longer than 3
+    matching_skills = _find_matching(required_skills, user_lowers, 2)
+    transferable_found = _find_matching(transferable_mining_skills, user_lowers, 3)
     
     # Calculate match score
     # Weight: 60% for required skills match, 40% for transferable skills
@@ -208,9 +193,10 @@ def map_mining_skills_to_career(
     match_score = (required_match_score * 0.6) + (transferable_match_score * 0.4)
     
     # Find missing skills
+    matched_lowers = {s.lower() for s in matching_skills}
     missing_skills = [
         skill for skill in required_skills
-        if skill.lower() not in [s.lower() for s in matching_skills]
+        if skill.lower() not in matched_lowers
     ]
     
     return {
@@ -222,3 +208,40 @@ def map_mining_skills_to_career(
         "transferable_count": len(transferable_found)
     }
 
+
+def map_mining_skills_to_career(
+    user_skills: List[str],
+    target_career: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    Map user's mining skills to a target career and calculate match.
+    
+    Args:
+        user_skills: List of user's transferable skills
+        target_career: Target career dictionary with required_skills and transferable_mining_skills
+        
+    Returns:
+        Dictionary with match_score, transferable_skills, missing_skills
+    """
+    return _match_career([skill.lower() for skill in user_skills], target_career)
+
+
+def map_mining_skills_to_careers(
+    user_skills: List[str],
+    target_careers: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """
+    Score a user against each career in turn.
+    
+    Same per-career matching as map_mining_skills_to_career; the only shared work is
+    lowercasing the user's skills once instead of once per career.
+    
+    Args:
+        user_skills: List of user's transferable skills
+        target_careers: Target career dictionaries
+        
+    Returns:
+        One match dictionary per career, in the same order
+    """
+    user_lowers = [skill.lower() for skill in user_skills]
+    return [_match_career(user_lowers, career) for career in target_careers]
@@ -26,6 +26,38 @@ ADD COLUMN IF NOT EXISTS commute_distance_miles DECIMAL(6,2), -- Distance from u
 ADD COLUMN IF NOT EXISTS commute_time_minutes INTEGER,
 ADD COLUMN IF NOT EXISTS local_job_growth TEXT; -- Regional growth information
 
+-- One saved match per (user, career): lets the backend upsert the top matches in one call.
+-- The old select-then-insert save could store the same pair twice, so keep only the newest
+-- row per pair first. learning_paths.career_id cascades on delete, so point learning paths
+-- at the kept row before removing the duplicates.
+WITH ranked AS (
+    SELECT id,
+           FIRST_VALUE(id) OVER (
+               PARTITION BY user_id, career_title
+               ORDER BY created_at DESC NULLS LAST, id DESC
+           ) AS keep_id
+    FROM career_matches
+)
+UPDATE learning_paths lp
+SET career_id = r.keep_id
+FROM ranked r
+WHERE lp.career_id = r.id
+  AND r.id <> r.keep_id;
+
+DELETE FROM career_matches cm
+USING (
+    SELECT id,
+           ROW_NUMBER() OVER (
+               PARTITION BY user_id, career_title
+               ORDER BY created_at DESC NULLS LAST, id DESC
+           ) AS rn
+    FROM career_matches
+) r
+WHERE cm.id = r.id
+  AND r.rn > 1;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_career_matches_user_career ON career_matches(user_id, career_title);
+
 -- Enhance learning_resources table for local programs
 ALTER TABLE learning_resources
 ADD COLUMN IF NOT EXISTS resource_category VARCHAR(100), -- "video", "course", "certification", "program"
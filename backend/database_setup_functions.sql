@@ -0,0 +1,95 @@
+-- SkillBridge Database Functions
+-- Run this script in Supabase SQL Editor after database_setup.sql and database_setup_coal_miners.sql
+-- These functions let the backend do multi-step writes in a single round-trip (called via supabase.rpc)
+
+-- ============================================================================
+-- 1. ONBOARDING
+-- ============================================================================
+
+-- Merge onboarding answers into users.metadata and mark onboarding as completed.
+-- Replaces the read-metadata / merge / update sequence with one atomic UPDATE.
+CREATE OR REPLACE FUNCTION finalize_onboarding(uid UUID, patch JSONB)
+RETURNS VOID
+LANGUAGE sql
+AS $$
+    UPDATE users
+    SET metadata = COALESCE(metadata, '{}'::jsonb) || patch,
+        onboarding_completed = TRUE,
+        onboarding_completed_at = NOW(),
+        updated_at = NOW()
+    WHERE id = uid;
+$$;
+
+-- Only the backend (service role) may call these functions
+REVOKE EXECUTE ON FUNCTION finalize_onboarding(UUID, JSONB) FROM PUBLIC, anon, authenticated;
+
+-- Merge a patch into users.metadata without reading it first.
+-- Used for onboarding on schemas that predate the onboarding_completed columns.
+CREATE OR REPLACE FUNCTION merge_user_metadata(uid UUID, patch JSONB)
+RETURNS VOID
+LANGUAGE sql
+AS $$
+    UPDATE users
+    SET metadata = COALESCE(metadata, '{}'::jsonb) || patch,
+        updated_at = NOW()
+    WHERE id = uid;
+$$;
+
+REVOKE EXECUTE ON FUNCTION merge_user_metadata(UUID, JSONB) FROM PUBLIC, anon, authenticated;
+
+-- ============================================================================
+-- 2. PROFILE UPDATES
+-- ============================================================================
+
+-- Apply a PUT /auth/user/profile in one transaction:
+--   user_patch     -> users.name / users.picture (only keys present are changed)
+--   profile_patch  -> user_profiles upsert (only keys present are changed)
+--   metadata_patch -> merged into users.metadata with jsonb ||
+CREATE OR REPLACE FUNCTION update_user_profile_bundle(
+    uid UUID,
+    user_patch JSONB,
+    profile_patch JSONB,
+    metadata_patch JSONB
+)
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF user_patch <> '{}'::jsonb OR metadata_patch <> '{}'::jsonb THEN
+        UPDATE users
+        SET name = CASE WHEN user_patch ? 'name' THEN user_patch->>'name' ELSE name END,
+            picture = CASE WHEN user_patch ? 'picture' THEN user_patch->>'picture' ELSE picture END,
+            metadata = COALESCE(metadata, '{}'::jsonb) || metadata_patch,
+            updated_at = NOW()
+        WHERE id = uid;
+    END IF;
+
+    IF profile_patch <> '{}'::jsonb THEN
+        INSERT INTO user_profiles AS p (
+            user_id, career_goals, work_experience,
+            previous_job_title, mining_role, mining_type, years_mining_experience,
+            created_at, updated_at
+        )
+        VALUES (
+            uid,
+            profile_patch->>'career_goals',
+            profile_patch->>'work_experience',
+            profile_patch->>'previous_job_title',
+            profile_patch->>'mining_role',
+            profile_patch->>'mining_type',
+            (profile_patch->>'years_mining_experience')::INTEGER,
+            NOW(), NOW()
+        )
+        ON CONFLICT (user_id) DO UPDATE SET
+            career_goals = CASE WHEN profile_patch ? 'career_goals' THEN EXCLUDED.career_goals ELSE p.career_goals END,
+            work_experience = CASE WHEN profile_patch ? 'work_experience' THEN EXCLUDED.work_experience ELSE p.work_experience END,
+            previous_job_title = CASE WHEN profile_patch ? 'previous_job_title' THEN EXCLUDED.previous_job_title ELSE p.previous_job_title END,
+            mining_role = CASE WHEN profile_patch ? 'mining_role' THEN EXCLUDED.mining_role ELSE p.mining_role END,
+            mining_type = CASE WHEN profile_patch ? 'mining_type' THEN EXCLUDED.mining_type ELSE p.mining_type END,
+            years_mining_experience = CASE WHEN profile_patch ? 'years_mining_experience' THEN EXCLUDED.years_mining_experience ELSE p.years_mining_experience END,
+            updated_at = NOW();
+    END IF;
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION update_user_profile_bundle(UUID, JSONB, JSONB, JSONB) FROM PUBLIC, anon, authenticated;
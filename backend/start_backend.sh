@@ -11,5 +11,5 @@ cd "$(dirname "$0")"
 # Start uvicorn server
 echo "Starting backend server on http://localhost:8000"
 echo "Press Ctrl+C to stop"
-uvicorn app.main:app --reload --host 0.0.0.0 --port 8000
+uvicorn app.main:app --reload --host 0.0.0.0 --port 8000 --loop uvloop --http httptools
 